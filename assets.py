@@ -0,0 +1,231 @@
+"""
+Static asset pipeline.
+
+``python assets.py build`` copies every file under static/ into static/dist/ under a
+content-hashed name (css/main.css -> css/main.1f2e3d4c5b.css), minifies CSS and JS,
+and writes gzip (and, with the ``brotli`` package, brotli) variants of the text
+assets next to them, listing everything in static/dist/manifest.json.
+
+At run time ``init_assets`` makes ``url_for('static', filename=...)`` return the
+hashed URL of any file in the manifest and serves /static/dist/ with one-year
+immutable caching, picking the precompressed variant the client accepts.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+ONE_YEAR = 365 * 24 * 3600
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.otf', '.json', '.txt', '.ico')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # in order of preference
+
+
+# ----------------------------------------------------------------------------#
+# Build.
+# ----------------------------------------------------------------------------#
+
+_css_comment = re.compile(r'/\*(?!!).*?\*/', re.S)
+_css_space = re.compile(r'\s+')
+_css_punctuation = re.compile(r'\s*([{};,>])\s*')
+_css_url = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(text):
+    try:
+        import rcssmin
+        return rcssmin.cssmin(text)
+    except ImportError:
+        # comments and whitespace only: nothing that could change what a rule means
+        text = _css_space.sub(' ', _css_comment.sub('', text))
+        return _css_punctuation.sub(r'\1', text).replace(';}', '}').strip()
+
+
+def minify_js(text):
+    try:
+        import rjsmin
+        return rjsmin.jsmin(text)
+    except ImportError:
+        return text  # no safe minifier without rjsmin; gzip/brotli still apply
+
+
+def _optimize_jpeg(data):
+    try:
+        from io import BytesIO
+        from PIL import Image
+    except ImportError:
+        return data
+    out = BytesIO()
+    Image.open(BytesIO(data)).save(out, 'JPEG', quality=85, optimize=True, progressive=True)
+    return out.getvalue() if out.tell() < len(data) else data
+
+
+def _rewrite_css_urls(text, source, manifest):
+    # url(../fonts/x.woff) must point at the hashed copy too; a hashed file stays in its directory
+    directory = os.path.dirname(source)
+
+    def replace(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/')):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        target = os.path.normpath(os.path.join(directory, path)).replace(os.sep, '/')
+        if target not in manifest:
+            return match.group(0)
+        hashed = os.path.relpath(manifest[target]['path'], directory or '.').replace(os.sep, '/')
+        return 'url(%s%s%s%s)' % (quote, hashed, suffix, quote)
+    return _css_url.sub(replace, text)
+
+
+def _hashed_name(path, data):
+    stem, ext = os.path.splitext(path)
+    return '%s.%s%s' % (stem, hashlib.sha256(data).hexdigest()[:10], ext)
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _compress(path, data):
+    encodings = []
+    variants = [('gzip', '.gz', gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.insert(0, ('br', '.br', brotli.compress(data, quality=11)))
+    for encoding, suffix, compressed in variants:
+        # not worth a second request path for a few percent
+        if len(compressed) < len(data) * 0.9:
+            _write(path + suffix, compressed)
+            encodings.append(encoding)
+    return encodings
+
+
+def _sources(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            dirs[:] = [d for d in dirs if d != DIST]
+        dirs.sort()
+        for name in sorted(files):
+            if not name.startswith('.'):
+                yield os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+
+
+def build(static_folder):
+    """Build static/dist and its manifest; returns the manifest."""
+    dist = os.path.join(static_folder, DIST)
+    manifest = {}
+    sources = list(_sources(static_folder))
+    # stylesheets last, so the files they reference already have their hashed names
+    for source in sorted(sources, key=lambda s: s.endswith('.css')):
+        with open(os.path.join(static_folder, source), 'rb') as f:
+            data = f.read()
+        ext = os.path.splitext(source)[1].lower()
+        if ext == '.css':
+            text = data.decode('utf-8')
+            if '.min.' not in source:
+                text = minify_css(text)
+            data = _rewrite_css_urls(text, source, manifest).encode('utf-8')
+        elif ext == '.js' and '.min.' not in source:
+            data = minify_js(data.decode('utf-8')).encode('utf-8')
+        elif ext in ('.jpg', '.jpeg'):
+            data = _optimize_jpeg(data)
+        hashed = _hashed_name(source, data)
+        _write(os.path.join(dist, hashed), data)
+        encodings = _compress(os.path.join(dist, hashed), data) if ext in COMPRESSIBLE else []
+        manifest[source] = {'path': hashed, 'encodings': encodings}
+    _write(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+# ----------------------------------------------------------------------------#
+# Serving.
+# ----------------------------------------------------------------------------#
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def init_assets(app):
+    """
+    Serve the built assets when ``ASSETS_FINGERPRINT`` is on (the default outside
+    debug mode) and static/dist/manifest.json exists; otherwise static files are
+    served by Flask as usual.
+    """
+    from flask import abort, request, send_from_directory
+
+    app.config.setdefault('ASSETS_FINGERPRINT', not app.debug)
+    if not app.config['ASSETS_FINGERPRINT']:
+        return
+    manifest = load_manifest(app.static_folder)
+    if manifest is None:
+        app.logger.warning('static/dist/manifest.json not found, run "python assets.py build"')
+        return
+    dist = os.path.join(app.static_folder, DIST)
+    encodings = {entry['path']: entry['encodings'] for entry in manifest.values()}
+
+    @app.url_defaults
+    def _fingerprint(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = '%s/%s' % (DIST, manifest[values['filename']]['path'])
+
+    def asset(filename):
+        if filename not in encodings:
+            abort(404)
+        suffix, encoding = '', None
+        for candidate, candidate_suffix in ENCODINGS:
+            if candidate in encodings[filename] and request.accept_encodings[candidate]:
+                suffix, encoding = candidate_suffix, candidate
+                break
+        response = send_from_directory(dist, filename + suffix, mimetype=mimetypes.guess_type(filename)[0],
+                                       max_age=ONE_YEAR)
+        if encoding:
+            response.content_encoding = encoding
+        if encodings[filename]:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    # more specific than Flask's /static/<path:filename>, so it wins for the built files
+    app.add_url_rule('%s/%s/<path:filename>' % (app.static_url_path, DIST), 'assets', asset)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build fingerprinted, precompressed static assets.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='write static/dist and its manifest')
+    build_parser.add_argument('--static', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    args = parser.parse_args(argv)
+
+    manifest = build(args.static)
+    dist = os.path.join(args.static, DIST)
+    before = after = 0
+    for source, entry in manifest.items():
+        before += os.path.getsize(os.path.join(args.static, source))
+        sizes = [os.path.getsize(os.path.join(dist, entry['path']))]
+        sizes += [os.path.getsize(os.path.join(dist, entry['path'] + suffix))
+                  for encoding, suffix in ENCODINGS if encoding in entry['encodings']]
+        after += min(sizes)
+    print('%d files, %d KB -> %d KB over the wire%s' % (
+        len(manifest), before // 1024, after // 1024, '' if brotli else ' (gzip only, brotli not installed)'),
+        file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+from bisect import bisect_left, insort
+from threading import Lock
+
+
+class PrefixIndex(object):
+    """
+    In-memory prefix index over (id, name) pairs.
+
+    Every word of a name is stored as a lowercase key in a sorted list, so a prefix
+    lookup is a bisect plus a short forward scan: typing "mus" finds "The Musical Hop".
+    add() and remove() update the list in place, one bisect per key, under the lock
+    that search() also takes; a rebuild swaps in new structures under it.
+    """
+
+    def __init__(self):
+        self._keys = []  # sorted (key, id)
+        self._names = {}  # id -> name
+        self._lock = Lock()
+        self.ready = False
+        self.version = None  # the name version the index is current with, see queries.name_index
+        self.checked_at = 0.0
+
+    @staticmethod
+    def _keys_for(id, name):
+        words = name.lower().split()
+        # every word suffix of the name, so both "the musical hop" and "musical hop" match
+        return [(' '.join(words[i:]), id) for i in range(len(words))]
+
+    def build(self, pairs, version=None):
+        keys, names = [], {}
+        for id, name in pairs:
+            names[id] = name
+            keys.extend(self._keys_for(id, name))
+        keys.sort()
+        with self._lock:
+            self._keys, self._names = keys, names
+            self.version = version
+            self.ready = True
+
+    def add(self, id, name, version=None):
+        """
+        Add or rename ``id``. ``version`` is the name version the write produced: when
+        it directly follows the index's own, the index is still current and need not be
+        rebuilt on the next check.
+        """
+        with self._lock:
+            self._discard(id)
+            self._names[id] = name
+            for key in self._keys_for(id, name):
+                insort(self._keys, key)
+            self._advance(version)
+
+    def remove(self, id, version=None):
+        with self._lock:
+            self._discard(id)
+            self._advance(version)
+
+    def _discard(self, id):
+        name = self._names.pop(id, None)
+        if name is not None:
+            for key in self._keys_for(id, name):
+                i = bisect_left(self._keys, key)
+                if i < len(self._keys) and self._keys[i] == key:
+                    del self._keys[i]
+
+    def _advance(self, version):
+        if version is not None and self.version is not None and version == self.version + 1:
+            self.version = version
+
+    def search(self, prefix, limit=10):
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            keys, names = self._keys, self._names
+            i = bisect_left(keys, (prefix,))
+            while i < len(keys) and len(results) < limit:
+                key, id = keys[i]
+                if not key.startswith(prefix):
+                    break
+                if id not in seen:
+                    seen.add(id)
+                    results.append({'id': id, 'name': names[id]})
+                i += 1
+        return results
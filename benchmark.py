@@ -0,0 +1,453 @@
+# ----------------------------------------------------------------------------#
+# Route benchmark for Fyyur.
+#
+#   python benchmark.py seed --scale 100k          # fill DATABASE_URL with synthetic data
+#   python benchmark.py run --out bench.json       # time every route, write results
+#   python benchmark.py run --compare bench.json   # ... and compare against an earlier run
+#
+# Point DATABASE_URL at a throwaway local Postgres that has been migrated with
+# `flask db upgrade`; `seed` truncates Venue, Artist and Show before loading.
+# ----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from models import db, Venue, Artist, Show
+from queries import encode_cursor
+
+SCALES = {'1k': 1000, '100k': 100000, '1m': 1000000}  # number of shows
+
+CITIES = [
+    ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('New York', 'NY'), ('Brooklyn', 'NY'),
+    ('Chicago', 'IL'), ('Austin', 'TX'), ('Houston', 'TX'), ('Seattle', 'WA'), ('Portland', 'OR'),
+    ('Denver', 'CO'), ('Nashville', 'TN'), ('New Orleans', 'LA'), ('Miami', 'FL'), ('Atlanta', 'GA'),
+    ('Boston', 'MA'), ('Philadelphia', 'PA'), ('Detroit', 'MI'), ('Minneapolis', 'MN'),
+]
+VENUE_WORDS = ['Hall', 'Lounge', 'Club', 'Hop', 'Room', 'Stage', 'Garden', 'Tavern', 'Theater', 'Bar']
+ARTIST_WORDS = ['Band', 'Trio', 'Quartet', 'Collective', 'Project', 'Orchestra', 'Crew', 'Ensemble']
+ADJECTIVES = ['Wild', 'Blue', 'Golden', 'Electric', 'Midnight', 'Velvet', 'Crimson', 'Silver', 'Lonely',
+              'Musical', 'Dueling', 'Quiet', 'Roaring', 'Neon', 'Paper', 'Iron']
+
+BATCH_SIZE = 5000
+
+
+def _app():
+    # imported lazily so DATABASE_URL can be set from the command line first
+    from app import create_app
+    return create_app()
+
+
+# ----------------------------------------------------------------------------#
+# Synthetic data.
+# ----------------------------------------------------------------------------#
+
+def _genres():
+    from forms import ArtistForm
+    return [value for value, _ in ArtistForm.genres.kwargs['choices']]
+
+
+def generate(scale, seed=0):
+    """
+    Yield (table, rows) batches for ``scale`` shows spread over scale/20 venues and
+    scale/10 artists, half of them in the past and half upcoming. The same seed
+    always produces the same data.
+    """
+    rnd = random.Random(seed)
+    genres = _genres()
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    num_venues = max(10, scale // 20)
+    num_artists = max(10, scale // 10)
+
+    def name(words, i):
+        return '%s %s %s %d' % (rnd.choice(['The', 'Club', 'Park']), rnd.choice(ADJECTIVES), rnd.choice(words), i)
+
+    venue_names, batch = [], []
+    for i in range(1, num_venues + 1):
+        city, state = rnd.choice(CITIES)
+        venue_names.append(name(VENUE_WORDS, i))
+        batch.append({
+            'id': i, 'name': venue_names[-1], 'city': city, 'state': state,
+            'address': '%d %s St' % (rnd.randint(1, 9999), rnd.choice(ADJECTIVES)),
+            'genres': rnd.sample(genres, rnd.randint(1, 3)), 'phone': '%03d-%03d-%04d' % (
+                rnd.randint(100, 999), rnd.randint(100, 999), rnd.randint(0, 9999)),
+            'image_link': 'https://images.example.com/venues/%d.jpg' % i,
+            'website': 'https://venue%d.example.com' % i,
+            'facebook_link': 'https://www.facebook.com/venue%d' % i,
+            'seeking_talent': rnd.choice(['YES', 'NO']),
+            'seeking_description': 'We are looking for an exciting artist to perform here!',
+        })
+        if len(batch) == BATCH_SIZE:
+            yield 'Venue', batch
+            batch = []
+    if batch:
+        yield 'Venue', batch
+
+    artist_names, batch = [], []
+    for i in range(1, num_artists + 1):
+        city, state = rnd.choice(CITIES)
+        artist_names.append(name(ARTIST_WORDS, i))
+        batch.append({
+            'id': i, 'name': artist_names[-1], 'city': city, 'state': state,
+            'phone': '%03d-%03d-%04d' % (rnd.randint(100, 999), rnd.randint(100, 999), rnd.randint(0, 9999)),
+            'genres': rnd.sample(genres, rnd.randint(1, 3)),
+            'image_link': 'https://images.example.com/artists/%d.jpg' % i,
+            'website': 'https://artist%d.example.com' % i,
+            'facebook_link': 'https://www.facebook.com/artist%d' % i,
+            'seeking_venue': rnd.choice(['YES', 'NO']),
+            'seeking_description': 'We are looking to perform at an exciting venue!',
+        })
+        if len(batch) == BATCH_SIZE:
+            yield 'Artist', batch
+            batch = []
+    if batch:
+        yield 'Artist', batch
+
+    batch = []
+    for i in range(1, scale + 1):
+        # popular venues and artists get more shows, like the real catalog
+        venue_id = min(num_venues, int(rnd.paretovariate(1.2))) if rnd.random() < 0.2 else rnd.randint(1, num_venues)
+        artist_id = rnd.randint(1, num_artists)
+        batch.append({
+            'id': i, 'venue_id': venue_id, 'artist_id': artist_id,
+            'venue_name': venue_names[venue_id - 1], 'artist_name': artist_names[artist_id - 1],
+            'start_time': now + timedelta(hours=rnd.randint(-24 * 365, 24 * 365)),
+        })
+        if len(batch) == BATCH_SIZE:
+            yield 'Show', batch
+            batch = []
+    if batch:
+        yield 'Show', batch
+
+
+def seed(scale, seed=0):
+    app = _app()
+    tables = {'Venue': Venue.__table__, 'Artist': Artist.__table__, 'Show': Show.__table__}
+    with app.app_context():
+        db.session.execute(db.text('TRUNCATE "Show", "Venue", "Artist" RESTART IDENTITY'))
+        counts = dict.fromkeys(tables, 0)
+        started = time.perf_counter()
+        for table, rows in generate(scale, seed):
+            db.session.execute(tables[table].insert(), rows)
+            counts[table] += len(rows)
+            print('\r%s' % ', '.join('%s: %d' % item for item in counts.items()), end='', file=sys.stderr)
+        for table in tables:
+            # keep the id sequences ahead of the explicit ids used above
+            db.session.execute(db.text(
+                "SELECT setval(pg_get_serial_sequence('\"%s\"', 'id'), (SELECT max(id) FROM \"%s\"))" % (table, table)))
+        # the workers' autocomplete indexes rebuild from the new names
+        db.session.execute(db.text('UPDATE "NameIndexVersion" SET version = version + 1'))
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE "Venue", "Artist", "Show"'))
+        db.session.commit()
+        print('\nseeded in %.1fs' % (time.perf_counter() - started), file=sys.stderr)
+
+
+# ----------------------------------------------------------------------------#
+# Route driver.
+# ----------------------------------------------------------------------------#
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def _read_requests():
+    """(name, method, url, form) for every read route, using ids that exist in the data."""
+    venue_id = db.session.query(db.func.min(Venue.id)).scalar()
+    artist_id = db.session.query(db.func.min(Artist.id)).scalar()
+    busiest_venue = db.session.query(Show.venue_id).group_by(Show.venue_id) \
+        .order_by(db.func.count(Show.id).desc()).limit(1).scalar() or venue_id
+    last_show = db.session.query(Show).order_by(Show.start_time.desc(), Show.id.desc()).first()
+    last_artist = db.session.query(Artist).order_by(Artist.name.desc(), Artist.id.desc()).first()
+    requests = [
+        ('index', 'GET', '/', None),
+        ('venues', 'GET', '/venues', None),
+        ('show_venue', 'GET', '/venues/%d' % venue_id, None),
+        ('show_venue (busiest)', 'GET', '/venues/%d' % busiest_venue, None),
+        ('artists', 'GET', '/artists', None),
+        ('show_artist', 'GET', '/artists/%d' % artist_id, None),
+        ('shows', 'GET', '/shows', None),
+        ('search_venues', 'POST', '/venues/search', {'search_term': 'Hop'}),
+        ('search_artists', 'POST', '/artists/search', {'search_term': 'band'}),
+        ('autocomplete venues', 'GET', '/autocomplete/venues?q=the', None),
+        ('autocomplete artists', 'GET', '/autocomplete/artists?q=wild', None),
+        ('cache_stats', 'GET', '/cache/stats', None),
+        ('create_venue_form', 'GET', '/venues/create', None),
+        ('create_artist_form', 'GET', '/artists/create', None),
+        ('create_shows', 'GET', '/shows/create', None),
+        ('edit_venue', 'GET', '/venues/%d/edit' % venue_id, None),
+        ('edit_artist', 'GET', '/artists/%d/edit' % artist_id, None),
+        # the JSON API counterparts of the pages above
+        ('api venues', 'GET', '/api/v1/venues', None),
+        ('api venues (id,name)', 'GET', '/api/v1/venues?fields=id,name', None),
+        ('api show_venue', 'GET', '/api/v1/venues/%d' % venue_id, None),
+        ('api show_venue (busiest)', 'GET', '/api/v1/venues/%d' % busiest_venue, None),
+        ('api artists', 'GET', '/api/v1/artists', None),
+        ('api show_artist', 'GET', '/api/v1/artists/%d' % artist_id, None),
+        ('api shows', 'GET', '/api/v1/shows', None),
+        ('api search_venues', 'GET', '/api/v1/venues/search?q=Hop', None),
+        ('api search_artists', 'GET', '/api/v1/artists/search?q=band', None),
+    ]
+    # deep pages must cost the same as the first one
+    if last_show is not None:
+        cursor = encode_cursor([last_show.start_time, last_show.id])
+        requests.append(('shows (last page)', 'GET', '/shows?before=%s' % cursor, None))
+        requests.append(('api shows (last page)', 'GET', '/api/v1/shows?before=%s' % cursor, None))
+    if last_artist is not None:
+        cursor = encode_cursor([last_artist.name, last_artist.id])
+        requests.append(('artists (last page)', 'GET', '/artists?before=%s' % cursor, None))
+    return requests
+
+
+def _venue_form(name):
+    return {'name': name, 'city': 'San Francisco', 'state': 'CA', 'address': '1 Bench St',
+            'phone': '415-000-0000', 'genres': ['Jazz', 'Folk'], 'image_link': 'https://images.example.com/b.jpg',
+            'website': 'https://bench.example.com', 'facebook_link': 'https://www.facebook.com/bench',
+            'seeking_talent': 'YES', 'seeking_description': 'benchmark'}
+
+
+def _artist_form(name):
+    return {'name': name, 'city': 'San Francisco', 'state': 'CA', 'phone': '415-000-0000',
+            'genres': ['Jazz'], 'image_link': 'https://images.example.com/b.jpg',
+            'website': 'https://bench.example.com', 'facebook_link': 'https://www.facebook.com/bench',
+            'seeking_venue': 'YES', 'seeking_description': 'benchmark'}
+
+
+def _timed(client, counter, method, url, data=None):
+    counter[0] = 0
+    started = time.perf_counter()
+    response = client.open(url, method=method, data=data)
+    response.get_data()
+    return (time.perf_counter() - started) * 1000.0, counter[0], response.status_code
+
+
+def _summarize(samples, queries, statuses):
+    return {
+        'p50_ms': round(_percentile(samples, 50), 3),
+        'p90_ms': round(_percentile(samples, 90), 3),
+        'p99_ms': round(_percentile(samples, 99), 3),
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'max_ms': round(max(samples), 3),
+        'queries': max(queries),
+        'status': sorted(set(statuses)),
+        'samples': len(samples),
+    }
+
+
+def run(iterations=50, warmup=3, cache=False):
+    flask_app = _app()
+    flask_app.config['PAGE_CACHE_ENABLED'] = cache
+    results = {}
+    counter = [0]
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        # the read-only transaction setup is not a query of the route
+        if context is None or not context.execution_options.get('sql_instrumentation_skip'):
+            counter[0] += 1
+
+    with flask_app.app_context():
+        engine = db.engine
+        reads = _read_requests()
+        db.session.close()
+
+    # requests run outside any app context so each gets its own flask.g, as in production
+    client = flask_app.test_client()
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        for name, method, url, data in reads:
+            for _ in range(warmup):
+                client.open(url, method=method, data=data)
+            samples, queries, statuses = [], [], []
+            for _ in range(iterations):
+                elapsed, n, status = _timed(client, counter, method, url, data)
+                samples.append(elapsed)
+                queries.append(n)
+                statuses.append(status)
+            results[name] = _summarize(samples, queries, statuses)
+            print('%-28s p50 %8.2fms  p99 %8.2fms  %3d queries' % (
+                name, results[name]['p50_ms'], results[name]['p99_ms'], results[name]['queries']),
+                file=sys.stderr)
+        results.update(_run_writes(client, counter, min(iterations, 20)))
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+    with flask_app.app_context():
+        plans = explain_checks()
+
+    covered = {flask_app.url_map.bind('localhost').match(url.split('?')[0], method=method)[0]
+               for _, method, url, _ in reads}
+    covered.update(('venues.create_venue_submission', 'artists.create_artist_submission',
+                    'shows.create_show_submission', 'venues.edit_venue_submission',
+                    'artists.edit_artist_submission', 'venues.delete_venue'))
+    missing = sorted(rule.endpoint for rule in flask_app.url_map.iter_rules()
+                     if rule.endpoint not in ('static', 'assets') and rule.endpoint not in covered)
+    return {'routes': results, 'plans': plans, 'unbenchmarked_endpoints': missing}
+
+
+def _run_writes(client, counter, iterations):
+    # every write uses a fresh name so the unique constraints never trip
+    tag = '%x' % int(time.time() * 1000)
+    timings = {name: ([], [], []) for name in (
+        'create_venue_submission', 'create_artist_submission', 'create_show_submission',
+        'edit_venue_submission', 'edit_artist_submission', 'delete_venue')}
+
+    def record(name, measurement):
+        for bucket, value in zip(timings[name], measurement):
+            bucket.append(value)
+
+    for i in range(iterations):
+        venue_name, artist_name = 'Bench Venue %s-%d' % (tag, i), 'Bench Artist %s-%d' % (tag, i)
+        record('create_venue_submission', _timed(client, counter, 'POST', '/venues/create', _venue_form(venue_name)))
+        record('create_artist_submission',
+               _timed(client, counter, 'POST', '/artists/create', _artist_form(artist_name)))
+        with client.application.app_context():
+            venue_id = db.session.query(Venue.id).filter(Venue.name == venue_name).scalar()
+            artist_id = db.session.query(Artist.id).filter(Artist.name == artist_name).scalar()
+            db.session.close()
+        record('create_show_submission', _timed(client, counter, 'POST', '/shows/create', {
+            'venue_id': str(venue_id), 'artist_id': str(artist_id), 'start_time': '2030-01-01 20:00:00'}))
+        record('edit_venue_submission', _timed(client, counter, 'POST', '/venues/%d/edit' % venue_id,
+                                               _venue_form(venue_name + ' edited')))
+        record('edit_artist_submission', _timed(client, counter, 'POST', '/artists/%d/edit' % artist_id,
+                                                _artist_form(artist_name + ' edited')))
+        record('delete_venue', _timed(client, counter, 'POST', '/venues/%d' % venue_id))
+        # the artist has no shows left, drop it so repeated runs do not grow the table
+        with client.application.app_context():
+            db.session.query(Artist).filter(Artist.id == artist_id).delete()
+            db.session.commit()
+            db.session.close()
+    return {name: _summarize(*measurements) for name, measurements in timings.items()}
+
+
+# ----------------------------------------------------------------------------#
+# Query plans.
+# ----------------------------------------------------------------------------#
+
+EXPLAIN_QUERIES = {
+    # the time-window lookups the Show indexes exist for
+    'venue upcoming shows': 'SELECT * FROM "Show" WHERE venue_id = :id AND start_time > now() ORDER BY start_time',
+    'artist upcoming shows': 'SELECT * FROM "Show" WHERE artist_id = :id AND start_time > now() ORDER BY start_time',
+    'shows first page': 'SELECT * FROM "Show" ORDER BY start_time, id LIMIT 50',
+    'venue name search': 'SELECT * FROM "Venue" WHERE name ILIKE \'%hop%\'',
+    'artist name search': 'SELECT * FROM "Artist" WHERE name ILIKE \'%band%\'',
+}
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        for node in _plan_nodes(child):
+            yield node
+
+
+def explain_checks():
+    """
+    EXPLAIN the queries the indexes were added for and report whether any of them
+    still sequentially scans its table. Compare runs from before and after a
+    migration to see the plan change.
+    """
+    checks = {}
+    for name, sql in EXPLAIN_QUERIES.items():
+        plan = db.session.execute(db.text('EXPLAIN (FORMAT JSON) ' + sql), {'id': 1}).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = list(_plan_nodes(plan[0]['Plan']))
+        checks[name] = {
+            'nodes': [node['Node Type'] for node in nodes],
+            'indexes': sorted({node['Index Name'] for node in nodes if 'Index Name' in node}),
+            'seq_scan': any(node['Node Type'] == 'Seq Scan' for node in nodes),
+            'total_cost': plan[0]['Plan']['Total Cost'],
+        }
+    db.session.close()
+    return checks
+
+
+# ----------------------------------------------------------------------------#
+# Comparison.
+# ----------------------------------------------------------------------------#
+
+def compare(baseline, current, max_regression=1.25):
+    """Print per-route deltas against ``baseline``; return False on any regression."""
+    ok = True
+    for name, now in sorted(current['routes'].items()):
+        before = baseline.get('routes', {}).get(name)
+        if before is None:
+            print('%-28s new' % name)
+            continue
+        ratio = now['p50_ms'] / before['p50_ms'] if before['p50_ms'] else 1.0
+        regressed = ratio > max_regression or now['queries'] > before['queries']
+        ok = ok and not regressed
+        print('%-28s p50 %8.2f -> %8.2fms (x%.2f)  queries %3d -> %3d%s' % (
+            name, before['p50_ms'], now['p50_ms'], ratio, before['queries'], now['queries'],
+            '  REGRESSION' if regressed else ''))
+    for name, plan in sorted(current.get('plans', {}).items()):
+        before = baseline.get('plans', {}).get(name)
+        if before is not None and before['seq_scan'] != plan['seq_scan']:
+            print('%-28s seq scan %s -> %s' % (name, before['seq_scan'], plan['seq_scan']))
+        if plan['seq_scan'] and before is not None and not before['seq_scan']:
+            ok = False
+    return ok
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Seed synthetic data and benchmark every Fyyur route.')
+    parser.add_argument('--database-url', help='defaults to $DATABASE_URL / config.py')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='truncate and fill Venue, Artist and Show')
+    seed_parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    seed_parser.add_argument('--seed', type=int, default=0)
+
+    run_parser = commands.add_parser('run', help='time every route through the Flask test client')
+    run_parser.add_argument('--iterations', type=int, default=50)
+    run_parser.add_argument('--warmup', type=int, default=3)
+    run_parser.add_argument('--cache', action='store_true', help='leave the rendered-page cache on')
+    run_parser.add_argument('--out', default='bench_results.json')
+    run_parser.add_argument('--compare', metavar='BASELINE_JSON')
+    run_parser.add_argument('--max-regression', type=float, default=1.25,
+                            help='fail --compare when a p50 grows by more than this factor')
+
+    args = parser.parse_args(argv)
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+
+    if args.command == 'seed':
+        seed(SCALES[args.scale], args.seed)
+        return 0
+
+    results = run(args.iterations, args.warmup, args.cache)
+    results['meta'] = {
+        'timestamp': datetime.now().isoformat(),
+        'git_revision': _git_revision(),
+        'iterations': args.iterations,
+        'page_cache': args.cache,
+    }
+    with open(args.out, 'w') as out:
+        json.dump(results, out, indent=2, sort_keys=True)
+    print('results written to %s' % args.out, file=sys.stderr)
+    if results['unbenchmarked_endpoints']:
+        print('not benchmarked: %s' % ', '.join(results['unbenchmarked_endpoints']), file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as baseline:
+            return 0 if compare(json.load(baseline), results, args.max_regression) else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
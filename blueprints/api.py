@@ -0,0 +1,236 @@
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, current_app, request
+
+from conditional import conditional, owner_probe, page_probe, table_probe, upcoming_probe
+from db_routing import reads_from_replica
+from models import db, Venue, Artist, Show
+from page_cache import cached_page, cache_tags, cache_until
+from queries import keyset_page, search_by_name, show_partitions, next_show_start
+
+try:
+    import orjson
+except ImportError:  # the standard library encoder is the fallback
+    orjson = None
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+MAX_LIMIT = 200
+PARTITION_FIELDS = ('past_shows', 'upcoming_shows', 'past_shows_count', 'upcoming_shows_count')
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def _json(data, status=200):
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, default=_json_default, separators=(',', ':'))
+    return Response(body, status=status, mimetype='application/json')
+
+
+@bp.errorhandler(400)
+@bp.errorhandler(404)
+def _error(e):
+    return _json({'error': e.description}, e.code)
+
+
+def _fields(model, default, computed=()):
+    # ?fields=id,name,... limited to the columns of ``model`` and the ``computed`` extras
+    requested = request.args.get('fields')
+    if not requested:
+        return list(default)
+    fields = [f.strip() for f in requested.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in model.__table__.c and f not in computed]
+    if unknown:
+        abort(400, 'Unknown fields: %s' % ', '.join(unknown))
+    return fields
+
+
+def _columns(model, fields, *always):
+    # only the requested columns are selected, plus the ones keying pagination and lookups
+    names = list(always) + [f for f in fields if f in model.__table__.c and f not in always]
+    return [getattr(model, name) for name in names]
+
+
+def _project(rows, columns, fields):
+    keys = [c.key for c in columns]
+    return [{f: values[f] for f in fields if f in values} for values in (dict(zip(keys, row)) for row in rows)]
+
+
+def _with_id(fields):
+    # the id is kept until the upcoming show counts have been looked up by it
+    return fields if 'id' in fields else ['id'] + fields
+
+
+def _page_size():
+    try:
+        return max(1, min(int(request.args.get('limit', current_app.config['PAGE_SIZE'])), MAX_LIMIT))
+    except ValueError:
+        abort(400, 'limit must be an integer')
+
+
+def _add_upcoming_counts(items, owner_column, fields, now):
+    if 'num_upcoming_shows' in fields:
+        partitions = show_partitions(owner_column, [item['id'] for item in items], now=now)
+        for item in items:
+            item['num_upcoming_shows'] = partitions[item['id']]['upcoming_shows_count']
+    if 'id' not in fields:
+        for item in items:
+            del item['id']
+    return items
+
+
+def _listing(model, order, fields):
+    columns = _columns(model, fields, *[c.key for c in order])
+    page = keyset_page(db.session.query(*columns), order,
+                       after=request.args.get('after'), before=request.args.get('before'), size=_page_size(),
+                       key=lambda row: [getattr(row, c.key) for c in order])
+    items = _project(page.items, columns, _with_id(fields))
+    return {'data': items, 'next': page.next_cursor, 'prev': page.prev_cursor}
+
+
+def _search(model, owner_column, fields, now):
+    columns = _columns(model, fields, 'id')
+    page, count, more = search_by_name(model, request.args.get('q', ''), columns=columns,
+                                       after=request.args.get('after'), before=request.args.get('before'))
+    items = _add_upcoming_counts(_project(page.items, columns, _with_id(fields)), owner_column, fields, now)
+    return _json({'count': count, 'count_more': more, 'data': items,
+                  'next': page.next_cursor, 'prev': page.prev_cursor})
+
+
+def _detail(model, id, owner_column, fields):
+    columns = _columns(model, fields, 'id')
+    row = db.session.query(*columns).filter(model.id == id).first()
+    if row is None:
+        abort(404, 'No such %s' % model.__name__.lower())
+    data = _project([row], columns, fields)[0]
+    partition_fields = [f for f in fields if f in PARTITION_FIELDS]
+    if partition_fields:
+        with_shows = 'past_shows' in fields or 'upcoming_shows' in fields
+        partition = show_partitions(owner_column, [id], with_shows=with_shows)[id]
+        data.update((f, partition[f]) for f in partition_fields)
+        if with_shows:
+            shows = partition['past_shows'] + partition['upcoming_shows']
+            other = 'artist' if owner_column is Show.venue_id else 'venue'
+            cache_tags(*('%s:%d' % (other, show['%s_id' % other]) for show in shows))
+            if partition['upcoming_shows']:
+                cache_until(partition['upcoming_shows'][0]['start_time'])
+    return _json({'data': data})
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+def _venue_fields():
+    return _fields(Venue, ('id', 'name', 'city', 'state', 'num_upcoming_shows'), ('num_upcoming_shows',))
+
+
+@bp.route('/venues')
+@reads_from_replica
+@conditional(page_probe(Venue, (Venue.city, Venue.state, Venue.id), _page_size),
+             upcoming_probe(when=lambda: 'num_upcoming_shows' in _venue_fields()))
+@cached_page
+def venues():
+    now = datetime.now()
+    fields = _venue_fields()
+    cache_tags('venues')
+    result = _listing(Venue, (Venue.city, Venue.state, Venue.id), fields)
+    if 'num_upcoming_shows' in fields:
+        cache_until(next_show_start(now))
+    _add_upcoming_counts(result['data'], Show.venue_id, fields, now)
+    return _json(result)
+
+
+@bp.route('/venues/search')
+@reads_from_replica
+def search_venues():
+    fields = _fields(Venue, ('id', 'name', 'num_upcoming_shows'), ('num_upcoming_shows',))
+    return _search(Venue, Show.venue_id, fields, datetime.now())
+
+
+@bp.route('/venues/<int:venue_id>')
+@reads_from_replica
+@conditional(owner_probe(Venue, Show.venue_id, Artist, Show.artist_id))
+@cached_page
+def show_venue(venue_id):
+    fields = _fields(Venue, [c.key for c in Venue.__table__.c] + list(PARTITION_FIELDS), PARTITION_FIELDS)
+    cache_tags('venue:%d' % venue_id)
+    return _detail(Venue, venue_id, Show.venue_id, fields)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+def _artist_fields():
+    return _fields(Artist, ('id', 'name', 'city', 'state'), ('num_upcoming_shows',))
+
+
+@bp.route('/artists')
+@reads_from_replica
+@conditional(page_probe(Artist, (Artist.name, Artist.id), _page_size),
+             upcoming_probe(when=lambda: 'num_upcoming_shows' in _artist_fields()))
+@cached_page
+def artists():
+    now = datetime.now()
+    fields = _artist_fields()
+    cache_tags('artists')
+    result = _listing(Artist, (Artist.name, Artist.id), fields)
+    if 'num_upcoming_shows' in fields:
+        cache_tags('shows')
+        cache_until(next_show_start(now))
+    _add_upcoming_counts(result['data'], Show.artist_id, fields, now)
+    return _json(result)
+
+
+@bp.route('/artists/search')
+@reads_from_replica
+def search_artists():
+    fields = _fields(Artist, ('id', 'name', 'num_upcoming_shows'), ('num_upcoming_shows',))
+    return _search(Artist, Show.artist_id, fields, datetime.now())
+
+
+@bp.route('/artists/<int:artist_id>')
+@reads_from_replica
+@conditional(owner_probe(Artist, Show.artist_id, Venue, Show.venue_id))
+@cached_page
+def show_artist(artist_id):
+    fields = _fields(Artist, [c.key for c in Artist.__table__.c] + list(PARTITION_FIELDS), PARTITION_FIELDS)
+    cache_tags('artist:%d' % artist_id)
+    return _detail(Artist, artist_id, Show.artist_id, fields)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@bp.route('/shows')
+@reads_from_replica
+@conditional(page_probe(Show, (Show.start_time, Show.id), _page_size), table_probe(Artist), table_probe(Venue))
+@cached_page
+def shows():
+    fields = _fields(Show, ('venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link', 'start_time'),
+                     ('artist_image_link', 'venue_image_link'))
+    cache_tags('shows')
+    order = (Show.start_time, Show.id)
+    columns = _columns(Show, fields, 'start_time', 'id')
+    query = db.session.query(*columns)
+    # the image links are joined in only when asked for
+    if 'artist_image_link' in fields:
+        image_link = Artist.image_link.label('artist_image_link')
+        query = query.outerjoin(Artist, Artist.id == Show.artist_id).add_columns(image_link)
+        columns.append(image_link)
+        cache_tags('artists')
+    if 'venue_image_link' in fields:
+        image_link = Venue.image_link.label('venue_image_link')
+        query = query.outerjoin(Venue, Venue.id == Show.venue_id).add_columns(image_link)
+        columns.append(image_link)
+        cache_tags('venues')
+    page = keyset_page(query, order, after=request.args.get('after'), before=request.args.get('before'),
+                       size=_page_size(), key=lambda row: [row.start_time, row.id])
+    return _json({'data': _project(page.items, columns, fields),
+                  'next': page.next_cursor, 'prev': page.prev_cursor})
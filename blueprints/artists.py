@@ -0,0 +1,183 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort
+from sqlalchemy.exc import SQLAlchemyError
+
+from conditional import conditional, owner_probe, page_probe
+from db_routing import reads_from_replica
+from db_session import stream_template
+from models import db, Venue, Artist, Show
+from page_cache import cached_page, cache_tags, cache_until, invalidate_pages
+from queries import keyset_stream, search_by_name, show_partitions, name_indexes, bump_name_version
+
+bp = Blueprint('artists', __name__)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@bp.route('/artists')
+@reads_from_replica
+@conditional(page_probe(Artist, (Artist.name, Artist.id)))
+@cached_page
+def artists():
+    """
+  Insert some basic information
+  """
+    # finished
+    cache_tags('artists')
+    page = keyset_stream(db.session.query(Artist.id, Artist.name, Artist.city, Artist.state), (Artist.name, Artist.id),
+                         after=request.args.get('after'), before=request.args.get('before'))
+
+    return stream_template('pages/artists.html', artists=page.items, page=page)
+
+
+@bp.route('/artists/search', methods=['POST'])
+@reads_from_replica
+def search_artists():
+    # search for "Gun" should return "Guns N Petals"; shorter terms match the start of names.
+    # search for "band" should return "The Wild Sax Band".
+    search_term = request.form.get('search_term', '')  # get user searching input
+    page, count, more = search_by_name(Artist, search_term,
+                                       after=request.form.get('after'), before=request.form.get('before'))
+    artists = page.items
+    partitions = show_partitions(Show.artist_id, [_.id for _ in artists])
+    response = {
+        "count": '%d+' % count if more else count,
+        "data": [{
+            "id": _.id,
+            "name": _.name,
+            "num_upcoming_shows": partitions[_.id]["upcoming_shows_count"],
+        } for _ in artists]
+    }
+    return render_template('pages/search_artists.html', results=response, page=page,
+                           search_term=request.form.get('search_term', ''))
+
+
+@bp.route('/artists/<int:artist_id>')
+@reads_from_replica
+@conditional(owner_probe(Artist, Show.artist_id, Venue, Show.venue_id))
+@cached_page
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    artist = db.session.query(Artist).get(artist_id)
+    if artist is None:
+        abort(404)
+    data = {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+    }
+    data.update(show_partitions(Show.artist_id, [artist_id], with_shows=True)[artist_id])
+    cache_tags('artist:%d' % artist_id,
+               *('venue:%d' % show['venue_id'] for show in data['past_shows'] + data['upcoming_shows']))
+    if data['upcoming_shows']:
+        cache_until(data['upcoming_shows'][0]['start_time'])
+
+    return render_template('pages/show_artist.html', artist=data)
+
+
+#  Update
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    from forms import ArtistForm
+    artist = db.session.query(Artist).get(artist_id)
+
+    form = ArtistForm(
+        name=artist.name,
+        city=artist.city,
+        state=artist.state,
+        genres=artist.genres,
+        phone=artist.phone,
+        facebook_link=artist.facebook_link,
+        website=artist.website,
+        image_link=artist.image_link,
+        seeking_venue=artist.seeking_venue,
+        seeking_description=artist.seeking_description)
+    if artist:
+        return render_template('forms/edit_artist.html', form=form, artist=artist)
+    else:
+        return render_template('errors/404.html')
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    # artist record with ID <artist_id> using the new attributes
+
+    try:
+        artist = db.session.query(Artist).get(artist_id)
+        artist.name = request.form['name']
+        artist.city = request.form['city']
+        artist.state = request.form['state']
+        artist.phone = request.form['phone']
+        artist.genres = request.form.getlist(
+            'genres')  # if the form data is an array, get the data using get list, otherwise, you get the first
+        artist.image_link = request.form['image_link']
+        artist.website = request.form['website']
+        artist.facebook_link = request.form['facebook_link']
+        artist.seeking_venue = request.form['seeking_venue']
+        artist.seeking_description = request.form['seeking_description']
+        version = bump_name_version('artists')
+        db.session.commit()
+        name_indexes['artists'].add(artist_id, request.form['name'], version)
+        invalidate_pages('artist:%d' % artist_id, 'artists', 'shows')
+        flash('Artist ' + request.form['name'] + ' was successfully edited!')
+    except SQLAlchemyError:
+        db.session.rollback()
+        flash('An error occurred. Artist ' + request.form['name'] + ' could not be modified.')
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    from forms import ArtistForm
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    # called upon submitting the new artist listing form
+    name = request.form['name']
+    city = request.form['city']
+    state = request.form['state']
+    phone = request.form['phone']
+    genres = request.form.getlist(
+        'genres')  # if the form data is an array, get the data using get list, otherwise, you get the first
+    image_link = request.form['image_link']
+    website = request.form['website']
+    facebook_link = request.form['facebook_link']
+    seeking_venue = request.form['seeking_venue']
+    seeking_description = request.form['seeking_description']
+
+    try:
+        a = Artist(name=name, city=city, state=state, phone=phone, genres=genres, facebook_link=facebook_link,
+                   image_link=image_link, website=website, seeking_venue=seeking_venue,
+                   seeking_description=seeking_description)
+
+        db.session.add(a)
+        db.session.flush()
+        artist_id = a.id
+        version = bump_name_version('artists')
+        db.session.commit()
+        name_indexes['artists'].add(artist_id, name, version)
+        invalidate_pages('artists')
+        flash('Artist ' + request.form['name'] + ' was successfully listed!')
+    except SQLAlchemyError:
+        db.session.rollback()
+        flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed.')
+    # on successful db insert, flash success
+    # flash('Artist ' + request.form['name'] + ' was successfully listed!')
+    # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+    return render_template('pages/home.html')
@@ -0,0 +1,29 @@
+from flask import Blueprint, Response, abort, request, stream_with_context
+
+from db_routing import reads_from_replica
+from db_session import hold_session
+from exporter import FORMATS, encode_rows, export_rows, gzipped, parse_since
+
+bp = Blueprint('exports', __name__)
+
+
+#  Exports
+#  ----------------------------------------------------------------
+
+@bp.route('/exports/<any(venues, artists, shows):target>')
+@reads_from_replica
+def export(target):
+    # streams a whole table: /exports/shows?format=csv&updated_since=2024-01-01T00:00:00
+    format = request.args.get('format', 'ndjson')
+    if format not in FORMATS:
+        abort(404)
+    try:
+        result = export_rows(target, parse_since(request.args.get('updated_since')))
+    except ValueError:
+        abort(400)
+    chunks = encode_rows(result, format)
+    headers = {'Content-Disposition': 'attachment; filename="%s.%s"' % (target, format), 'Vary': 'Accept-Encoding'}
+    if request.accept_encodings['gzip']:
+        chunks = gzipped(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return hold_session(Response(stream_with_context(chunks), mimetype=FORMATS[format], headers=headers))
@@ -0,0 +1,100 @@
+from flask import Blueprint, Response, current_app, jsonify, render_template, request
+from sqlalchemy.exc import SQLAlchemyError
+
+from db_routing import reads_from_replica
+from models import db
+from queries import name_index
+
+bp = Blueprint('pages', __name__)
+
+
+@bp.route('/')
+def index():
+    return render_template('pages/home.html')
+
+
+#  Monitoring
+#  ----------------------------------------------------------------
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    return Response(current_app.extensions['metrics'].render(), mimetype='text/plain; version=0.0.4')
+
+
+#  Health
+#  ----------------------------------------------------------------
+
+def _pool_status(engine):
+    pool = engine.pool
+    status = {'class': type(pool).__name__}
+    for attr in ('size', 'checkedout', 'overflow'):
+        if hasattr(pool, attr):  # QueuePool has all three; NullPool and friends do not
+            status[attr] = getattr(pool, attr)()
+    max_overflow = getattr(pool, '_max_overflow', None)
+    if 'size' in status and max_overflow is not None and max_overflow >= 0:
+        status['available'] = status['size'] + max_overflow - status['checkedout']
+    return status
+
+
+def _pools():
+    return {bind_key or 'primary': engine for bind_key, engine in db.engines.items()}
+
+
+@bp.route('/healthz')
+def healthz():
+    # liveness: the worker is up and answering; never touches the database
+    return jsonify(status='ok', pools={name: _pool_status(engine) for name, engine in _pools().items()})
+
+
+@bp.route('/readyz')
+def readyz():
+    # readiness: a connection to every database can be checked out and used right now. A
+    # saturated pool answers 503 without waiting for a connection, so the load balancer
+    # sends the request to another instance instead of queueing it here
+    pools, failures = {}, {}
+    for name, engine in _pools().items():
+        pools[name] = _pool_status(engine)
+        if pools[name].get('available', 1) <= 0:
+            failures[name] = 'pool exhausted'
+            continue
+        try:
+            with engine.connect() as connection:
+                connection.execute(db.text('SELECT 1'))
+        except SQLAlchemyError as e:
+            current_app.logger.warning('readiness check of %s failed: %s', name, e)
+            failures[name] = 'database unreachable'
+    if failures:
+        return jsonify(status='unavailable', reasons=failures, pools=pools), 503
+    return jsonify(status='ok', pools=pools)
+
+
+#  Page cache
+#  ----------------------------------------------------------------
+
+@bp.route('/cache/stats')
+def cache_stats():
+    return jsonify(current_app.extensions['page_cache'].stats())
+
+
+#  Autocomplete
+#  ----------------------------------------------------------------
+
+@bp.route('/autocomplete/<any(artists, venues):kind>')
+@reads_from_replica
+def autocomplete(kind):
+    # served entirely from the in-memory name index, no database round trip per keystroke
+    index = name_index(kind)
+    return jsonify(data=index.search(request.args.get('q', ''), limit=10))
+
+
+#  Errors
+#  ----------------------------------------------------------------
+
+@bp.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+
+@bp.app_errorhandler(500)
+def server_error(error):
+    return render_template('errors/500.html'), 500
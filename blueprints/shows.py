@@ -0,0 +1,66 @@
+from flask import Blueprint, render_template, request, flash
+from sqlalchemy.exc import SQLAlchemyError
+
+from conditional import conditional, page_probe, table_probe
+from db_routing import reads_from_replica
+from db_session import stream_template
+from models import db, Venue, Artist, Show
+from page_cache import cached_page, cache_tags, invalidate_pages
+from queries import keyset_stream
+
+bp = Blueprint('shows', __name__)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@bp.route('/shows')
+@reads_from_replica
+@conditional(page_probe(Show, (Show.start_time, Show.id)), table_probe(Artist))
+@cached_page
+def shows():
+    # displays list of shows at /shows
+    cache_tags('shows')
+    # rows go straight from the cursor to the template, the artist image joined in
+    query = db.session.query(Show.id, Show.venue_id, Show.venue_name, Show.artist_id, Show.artist_name,
+                             Artist.image_link.label('artist_image_link'), Show.start_time) \
+        .outerjoin(Artist, Artist.id == Show.artist_id)
+    page = keyset_stream(query, (Show.start_time, Show.id),
+                         after=request.args.get('after'), before=request.args.get('before'))
+
+    return stream_template('pages/shows.html', shows=page.items, page=page)
+
+
+@bp.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    from forms import ShowForm
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    # called to create new shows in the db, upon submitting new show listing form
+
+    try:
+        show = Show(
+            artist_id=request.form['artist_id'],
+            venue_id = request.form['venue_id'],
+            artist_name=db.session.query(Artist).get(request.form['artist_id']).name,
+            venue_name=db.session.query(Venue).get(request.form['venue_id']).name,
+            start_time=request.form['start_time']
+        )
+        db.session.add(show)
+        db.session.commit()
+        invalidate_pages('venue:%d' % int(request.form['venue_id']), 'artist:%d' % int(request.form['artist_id']),
+                         'venues', 'shows')
+        flash('Show belongs to artist num: ' + request.form['artist_id'] + ' was successfully listed!')
+    except SQLAlchemyError:
+        db.session.rollback()
+        flash('An error occurred. Show could not be listed.')
+    # on successful db insert, flash success
+    # flash('Show was successfully listed!')
+    # e.g., flash('An error occurred. Show could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template('pages/home.html')
@@ -0,0 +1,229 @@
+from itertools import groupby
+from operator import itemgetter
+
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort
+from sqlalchemy.exc import SQLAlchemyError
+
+from conditional import conditional, owner_probe, table_probe
+from db_routing import reads_from_replica
+from db_session import stream_template
+from models import db, Venue, Artist, Show
+from page_cache import cached_page, cache_tags, cache_until, invalidate_pages
+from queries import search_by_name, show_partitions, name_indexes, bump_name_version, stream_rows
+
+bp = Blueprint('venues', __name__)
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@bp.route('/venues')
+@reads_from_replica
+@conditional(table_probe(Venue))
+@cached_page
+def venues():
+    cache_tags('venues')
+    query = db.session.query(Venue.city, Venue.state, Venue.id, Venue.name) \
+        .order_by(Venue.city, Venue.state, Venue.id)
+
+    return stream_template('pages/venues.html', areas=_areas(stream_rows(query)))
+
+
+def _areas(rows):
+    # rows arrive ordered by area, so one pass groups them, one area at a time
+    for (city, state), area_rows in groupby(rows, key=itemgetter(0, 1)):
+        yield {
+            "city": city,
+            "state": state,
+            "venues": [{
+                "id": venue_id,
+                "name": name,
+            } for _, _, venue_id, name in area_rows]}
+
+
+@bp.route('/venues/search', methods=['POST'])
+@reads_from_replica
+def search_venues():
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+    # finished
+    try:
+        search_term = request.form.get('search_term', '')  # get user searching input
+
+        page, count, more = search_by_name(Venue, search_term,  # get the best matches
+                                           after=request.form.get('after'), before=request.form.get('before'))
+        results = page.items
+        partitions = show_partitions(Show.venue_id, [v.id for v in results])
+
+        response = {
+            "count": '%d+' % count if more else count,
+            "data": [{
+                "id": v.id,
+                "name": v.name,
+                "num_upcoming_shows": partitions[v.id]["upcoming_shows_count"]
+            } for v in results]
+        }
+        return render_template('pages/search_venues.html', results=response, page=page,
+                               search_term=request.form.get('search_term', ''))
+    except SQLAlchemyError:
+        db.session.rollback()
+        flash('An error occurred while searching, please try again')
+        return redirect(url_for('venues.venues'))
+
+
+@bp.route('/venues/<int:venue_id>')
+@reads_from_replica
+@conditional(owner_probe(Venue, Show.venue_id, Artist, Show.artist_id))
+@cached_page
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    venue = db.session.query(Venue).get(venue_id)
+    if venue is None:
+        abort(404)
+    data = {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+    }
+    data.update(show_partitions(Show.venue_id, [venue_id], with_shows=True)[venue_id])
+    cache_tags('venue:%d' % venue_id,
+               *('artist:%d' % show['artist_id'] for show in data['past_shows'] + data['upcoming_shows']))
+    if data['upcoming_shows']:
+        cache_until(data['upcoming_shows'][0]['start_time'])
+
+    return render_template('pages/show_venue.html', venue=data)
+
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    from forms import VenueForm
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+
+    name = request.form['name']
+    city = request.form['city']
+    state = request.form['state']
+    phone = request.form['phone']
+    address = request.form['address']
+    genres = request.form.getlist(
+        'genres')  # if the form data is an array, get the data using get list, otherwise, you get the first
+    image_link = request.form['image_link']
+    website = request.form['website']
+    facebook_link = request.form['facebook_link']
+    seeking_talent = request.form['seeking_talent']
+    seeking_description = request.form['seeking_description']
+
+    try:
+        v = Venue(name=name, city=city, state=state, phone=phone, genres=genres, facebook_link=facebook_link,
+                  address=address, image_link=image_link, website=website, seeking_talent=seeking_talent,
+                  seeking_description=seeking_description)
+
+        db.session.add(v)
+        db.session.flush()
+        venue_id = v.id
+        version = bump_name_version('venues')
+        db.session.commit()
+        name_indexes['venues'].add(venue_id, name, version)
+        invalidate_pages('venues')
+        flash('Venue ' + request.form['name'] + ' was successfully listed!')
+    except SQLAlchemyError:
+        db.session.rollback()
+        flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.')
+    # on successful db insert, flash success
+    # flash('Venue ' + request.form['name'] + ' was successfully listed!')
+    # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    return render_template('pages/home.html')
+
+
+@bp.route('/venues/<venue_id>', methods=['POST'])
+def delete_venue(venue_id):
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+    try:
+        show = db.session.query(Show).filter(Show.venue_id == venue_id)
+        q = db.session.query(Venue).filter(Venue.id == venue_id)
+        show.delete()
+        q.delete()
+        version = bump_name_version('venues')
+        db.session.commit()
+        name_indexes['venues'].remove(int(venue_id), version)
+        invalidate_pages('venue:%d' % int(venue_id), 'venues', 'shows')
+    except SQLAlchemyError:
+        db.session.rollback()
+        flash('Something goes wrong')
+
+    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+    return render_template('pages/home.html')
+
+
+#  Update
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    from forms import VenueForm
+    venue = db.session.query(Venue).filter(Venue.id == venue_id).first()
+    form = VenueForm(
+        name=venue.name,
+        city=venue.city,
+        state=venue.state,
+        genres=venue.genres,
+        address=venue.address,
+        phone=venue.phone,
+        facebook_link=venue.facebook_link,
+        website=venue.website,
+        image_link=venue.image_link,
+        seeking_talent=venue.seeking_talent,
+        seeking_description=venue.seeking_description)
+    if venue:
+        return render_template('forms/edit_venue.html', form=form, venue=venue)
+    else:
+        return render_template('errors/404.html')
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+
+    try:
+        venue = db.session.query(Venue).get(venue_id)
+        venue.name = request.form['name']
+        venue.city = request.form['city']
+        venue.state = request.form['state']
+        venue.phone = request.form['phone']
+        venue.address = request.form['address']
+        venue.genres = request.form.getlist(
+            'genres')  # if the form data is an array, get the data using get list, otherwise, you get the first
+        venue.image_link = request.form['image_link']
+        venue.website = request.form['website']
+        venue.facebook_link = request.form['facebook_link']
+        venue.seeking_talent = request.form['seeking_talent']
+        venue.seeking_description = request.form['seeking_description']
+        version = bump_name_version('venues')
+        db.session.commit()
+        name_indexes['venues'].add(venue_id, request.form['name'], version)
+        invalidate_pages('venue:%d' % venue_id, 'venues', 'shows')
+        flash('Venue ' + request.form['name'] + ' was successfully edited!')
+    except SQLAlchemyError:
+        db.session.rollback()
+        flash('An error occurred. Venue ' + request.form['name'] + ' could not be modified.')
+
+    # venue record with ID <venue_id> using the new attributes
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))
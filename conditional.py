@@ -0,0 +1,143 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, request, session
+from sqlalchemy import select, true
+
+from models import db, Show
+from queries import keyset_window
+
+
+# ----------------------------------------------------------------------------#
+# Probes.
+# ----------------------------------------------------------------------------#
+
+# A probe takes the view's arguments and returns a one-row aggregate query over the
+# rows a page shows: enough to notice any insert, update or delete, without loading them.
+# It returns None when the page the request asks for does not depend on its rows.
+
+def table_probe(model):
+    def probe(*args):
+        return select(db.func.count(model.id), db.func.max(model.updated_at))
+    return probe
+
+
+def upcoming_probe(when=None):
+    """
+    Pages counting upcoming shows change as shows become past, without any write. The
+    count covers the upcoming shows only, a range of ix_Show_start_time, and the latest
+    update is one lookup in ix_Show_updated_at. ``when`` is a callable telling whether
+    the request's page has the counts at all; the probe is left out when it does not.
+    """
+    def probe(*args):
+        if when is not None and not when():
+            return None
+        upcoming = select(db.func.count()).select_from(Show).where(Show.start_time > datetime.now())
+        updated = select(db.func.max(Show.updated_at))
+        return select(upcoming.scalar_subquery().label('upcoming'), updated.scalar_subquery().label('updated_at'))
+    return probe
+
+
+def page_probe(model, columns, size=None):
+    """The keyset page of ``model`` the request asks for; ``size`` is a callable giving its size."""
+    def probe(*args):
+        query = db.session.query(model.id, model.updated_at)
+        window = keyset_window(query, columns, request.args.get('after'), request.args.get('before'),
+                               size() if size else None).subquery()
+        # the sum of the ids changes when a row leaves the page and another one moves in
+        return select(db.func.count(), db.func.sum(window.c.id), db.func.max(window.c.updated_at))
+    return probe
+
+
+def owner_probe(model, owner_column, other, other_column):
+    """A venue or artist with its shows and the artists or venues they are with; no row if it does not exist."""
+    def probe(id):
+        return select(model.updated_at, db.func.count(Show.id),
+                      db.func.count(Show.id).filter(Show.start_time > datetime.now()),
+                      db.func.max(Show.updated_at), db.func.max(other.updated_at)) \
+            .select_from(model) \
+            .outerjoin(Show, owner_column == model.id) \
+            .outerjoin(other, other.id == other_column) \
+            .where(model.id == id) \
+            .group_by(model.id)
+    return probe
+
+
+# ----------------------------------------------------------------------------#
+# Conditional GET.
+# ----------------------------------------------------------------------------#
+
+def _version(app):
+    # pages change with the templates and views that render them, and with the asset URLs
+    # they link to, so a deploy changes every ETag
+    digest = hashlib.sha1()
+    manifest = os.path.join(app.static_folder, 'dist', 'manifest.json')
+    if os.path.exists(manifest):
+        with open(manifest, 'rb') as f:
+            digest.update(f.read())
+    for folder in (os.path.join(app.root_path, app.template_folder), os.path.join(app.root_path, 'blueprints')):
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(('.html', '.py')):
+                    with open(os.path.join(root, name), 'rb') as f:
+                        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def init_conditional(app):
+    app.config.setdefault('CONDITIONAL_GET_ENABLED', True)
+    app.config.setdefault('ETAG_VERSION', _version(app))
+
+
+def conditional(*probes):
+    """
+    Answer a GET with ``304 Not Modified``, before the view loads or renders anything,
+    when the client's copy of the page is still current.
+
+    The ``probes`` run as one statement; their values and ``ETAG_VERSION`` make the
+    page's ETag, and the latest timestamp among them its Last-Modified; the ETag is
+    also part of the page cache key, see cached_page, so the probes run for the cache
+    even with ``CONDITIONAL_GET_ENABLED`` off. Only
+    If-None-Match is honoured: a delete changes the ETag but no timestamp, so
+    If-Modified-Since alone is always answered in full.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            enabled = current_app.config['CONDITIONAL_GET_ENABLED']
+            if not (enabled or current_app.config['PAGE_CACHE_ENABLED']) or '_flashes' in session:
+                return view(*args, **kwargs)
+            subqueries = [probe(*kwargs.values()) for probe in probes]
+            subqueries = [query.subquery() for query in subqueries if query is not None]
+            query = select(*[c for subquery in subqueries for c in subquery.c]).select_from(subqueries[0])
+            for subquery in subqueries[1:]:
+                query = query.join(subquery, true())
+            values = db.session.execute(query).one_or_none()
+            if values is None:
+                return view(*args, **kwargs)
+
+            state = (current_app.config['ETAG_VERSION'], request.endpoint, tuple(values))
+            etag = hashlib.sha1(repr(state).encode()).hexdigest()
+            # cached_page keys on it too: a page cached before a write another worker or
+            # `flask import` made, which did not invalidate this process's cache, is never
+            # served again
+            g.page_version = etag
+            if not enabled:
+                return view(*args, **kwargs)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                stamps = [v for v in values if isinstance(v, datetime)]
+                if stamps:
+                    response.last_modified = max(stamps).replace(tzinfo=timezone.utc)
+            response.set_etag(etag, weak=True)
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
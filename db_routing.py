@@ -0,0 +1,56 @@
+import time
+from functools import wraps
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+STICKY_COOKIE = 'fyyur_primary_until'
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the queries of views marked with ``reads_from_replica`` to the
+    ``replica`` bind and everything else, every flush included, to the primary.
+    Without a replica configured it behaves exactly like Flask-SQLAlchemy's session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context() and g.get('db_replica'):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super(RoutingSession, self).get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _sticky():
+    # a client that has just written reads from the primary until its cookie runs out,
+    # so it never sees a replica that has not caught up with its own write yet
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def reads_from_replica(view):
+    """Run ``view`` against the read replica, unless this client wrote something moments ago."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _sticky():
+            g.db_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_routing(app):
+    app.config.setdefault('REPLICA_STICKY_SECONDS', 10)
+
+    @app.after_request
+    def _stick_to_primary(response):
+        # any successful non-GET outside the replica views is treated as a write
+        if (REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {}) and request.method not in ('GET', 'HEAD')
+                and not g.get('db_replica') and response.status_code < 400):
+            seconds = app.config['REPLICA_STICKY_SECONDS']
+            response.set_cookie(STICKY_COOKIE, '%d' % (time.time() + seconds), max_age=seconds, httponly=True,
+                                samesite='Lax')
+        return response
@@ -0,0 +1,113 @@
+from flask import (Response, before_render_template, current_app, g, has_request_context, request,
+                   stream_with_context, template_rendered)
+from sqlalchemy import event
+
+from db_routing import RoutingSession
+from models import db
+
+# statements issued here are bookkeeping, not queries of the view, so SQL instrumentation skips them
+_INTERNAL = {'sql_instrumentation_skip': True}
+
+CHUNK_SIZE = 8 * 1024  # characters of rendered page per chunk sent
+
+
+def _read_only():
+    return g.get('db_read_only') or g.get('db_replica')
+
+
+@event.listens_for(RoutingSession, 'after_begin')
+def _begin_request_transaction(session, transaction, connection):
+    # only transactions of a web request get a timeout: `flask db upgrade` and `flask import`
+    # run outside one and may take as long as they need
+    if not has_request_context() or connection.dialect.name != 'postgresql':
+        return
+    config = current_app.config
+    statements = ['SET TRANSACTION READ ONLY'] if _read_only() else []
+    if request.endpoint in config['SQL_STATEMENT_TIMEOUTS']:
+        timeout = config['SQL_STATEMENT_TIMEOUTS'][request.endpoint]
+    elif _read_only() and config['SQL_READ_ONLY_TIMEOUT_MS']:
+        timeout = config['SQL_READ_ONLY_TIMEOUT_MS']
+    else:
+        timeout = config['DB_STATEMENT_TIMEOUT_MS']
+    if timeout:
+        statements.append('SET LOCAL statement_timeout = %d' % int(timeout))
+    if statements:
+        connection.exec_driver_sql('; '.join(statements), execution_options=_INTERNAL)
+
+
+def init_db_session(app):
+    """
+    One database session per request, whatever the view does with it.
+
+    Every request transaction gets a statement timeout: ``SQL_STATEMENT_TIMEOUTS``
+    per endpoint, else ``SQL_READ_ONLY_TIMEOUT_MS`` for GET and HEAD requests and
+    views reading from the replica, which run read-only, else ``DB_STATEMENT_TIMEOUT_MS``.
+    Read-only requests have their session closed as soon as template
+    rendering starts, so the connection is back in the pool while the page renders
+    (streamed responses keep theirs until sent, see hold_session()).
+    A request that fails is rolled back; every session is removed at teardown.
+    """
+    app.config.setdefault('DB_STATEMENT_TIMEOUT_MS', 0)
+    app.config.setdefault('SQL_READ_ONLY_TIMEOUT_MS', 0)
+    app.config.setdefault('SQL_STATEMENT_TIMEOUTS', {})
+
+    @app.before_request
+    def _mark_read_only():
+        g.db_read_only = request.method in ('GET', 'HEAD')
+
+    def _release_before_render(sender, template, context, **extra):
+        if _read_only():
+            db.session.close()
+
+    before_render_template.connect(_release_before_render, app, weak=False)
+
+    @app.teardown_request
+    def _end_session(exc):
+        if exc is not None:
+            db.session.rollback()
+        db.session.remove()
+
+
+def _chunked(pieces):
+    # Jinja yields every tag and text node on its own; send them in chunks of CHUNK_SIZE
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def hold_session(response):
+    """
+    Keep the request's session, and the connection it has checked out, open until
+    ``response`` is closed. A streamed response is sent after the request has been
+    torn down, which would otherwise close the server-side cursor it reads from.
+    """
+    session = db.session()
+    db.session.registry.clear()  # teardown now gets a fresh session, not this one
+    response.call_on_close(session.close)
+    return response
+
+
+def stream_template(template_name, **context):
+    """
+    Like flask.stream_template, for pages reading their rows from a server-side
+    cursor (see queries.stream_rows) as they render, with the session held open by
+    hold_session(). The page goes out in chunks of CHUNK_SIZE while the rows are
+    still being read.
+    """
+    app = current_app._get_current_object()
+    template = app.jinja_env.get_or_select_template(template_name)
+    app.update_template_context(context)
+
+    def generate():
+        yield from _chunked(template.generate(context))
+        template_rendered.send(app, _async_wrapper=app.ensure_sync, template=template, context=context)
+
+    response = hold_session(Response(stream_with_context(generate()), mimetype='text/html'))
+    before_render_template.send(app, _async_wrapper=app.ensure_sync, template=template, context=context)
+    return response
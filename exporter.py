@@ -0,0 +1,121 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timezone
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from importer import LIST_SEPARATOR
+from models import db, Venue, Artist, Show
+
+TARGETS = {'venues': Venue, 'artists': Artist, 'shows': Show}
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+YIELD_PER = 2000  # rows fetched per round trip from the server-side cursor
+CHUNK_SIZE = 1 << 16  # characters of output handed on at a time
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'  # what the forms, and so `flask import`, accept
+
+
+def parse_since(value):
+    """Parse an ``updated_since`` value (ISO 8601, UTC unless it says otherwise), or return None for an empty one."""
+    if not value:
+        return None
+    since = datetime.fromisoformat(value)
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def export_rows(target, updated_since=None):
+    """
+    Execute the export query of ``target`` and return its result, read through a
+    server-side cursor ``YIELD_PER`` rows at a time, in id order. Raises ValueError
+    if ``updated_since`` is given for a table without an ``updated_at`` column.
+    """
+    table = TARGETS[target].__table__
+    query = select(table).order_by(table.c.id)
+    if updated_since is not None:
+        if 'updated_at' not in table.c:
+            raise ValueError('%s have no updated_at column to filter on' % target)
+        query = query.where(table.c.updated_at > updated_since)
+    return db.session.execute(query, execution_options={'yield_per': YIELD_PER})
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def _csv_value(value):
+    # the same shapes `flask import` reads back
+    if isinstance(value, list):
+        return LIST_SEPARATOR.join(value)
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    return value
+
+
+def encode_rows(result, format='ndjson'):
+    """Yield ``result`` as NDJSON or CSV (with a header row), in chunks of about ``CHUNK_SIZE``."""
+    keys = list(result.keys())
+    buffer = io.StringIO()
+    if format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(keys)
+        for row in result:
+            writer.writerow([_csv_value(value) for value in row])
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    else:
+        for row in result:
+            buffer.write(json.dumps(dict(zip(keys, row)), default=_json_default))
+            buffer.write('\n')
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzipped(chunks, level=6):
+    """Gzip a stream of text chunks as it goes."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@click.command('export')
+@click.argument('target', type=click.Choice(sorted(TARGETS)))
+@click.option('-o', '--output', default='-', type=click.File('wb'), help='Default: standard output.')
+@click.option('--format', type=click.Choice(sorted(FORMATS)), default='ndjson', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output; implied by an OUTPUT ending in .gz.')
+@click.option('--updated-since', help='Only rows changed after this ISO 8601 time.')
+@with_appcontext
+def export_command(target, output, format, compress, updated_since):
+    """Stream all rows of TARGET (venues, artists or shows) as NDJSON or CSV.
+
+    Rows are read through a server-side cursor and written as they arrive, so
+    memory use does not depend on the size of the table.
+    """
+    try:
+        result = export_rows(target, parse_since(updated_since))
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--updated-since')
+    chunks = encode_rows(result, format)
+    if compress or getattr(output, 'name', '').endswith('.gz'):
+        for data in gzipped(chunks):
+            output.write(data)
+    else:
+        for chunk in chunks:
+            output.write(chunk.encode('utf-8'))
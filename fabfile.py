@@ -13,6 +13,14 @@ def test():
         abort("Aborted at user request.")
 
 
+def benchmark(baseline="bench_results.json"):
+    # time every route against the local DATABASE_URL and compare with the last run
+    with settings(warn_only=True):
+        result = local("python benchmark.py run --out bench_latest.json --compare {}".format(baseline))
+    if result.failed and not confirm("Benchmark regressed. Continue?"):
+        abort("Aborted at user request.")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
+# babel and dateutil are imported on first use, not when a worker boots
+
+DATETIME_PATTERNS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def _datetime_pattern(format, locale):
+    # parse the pattern and resolve the locale once per (format, locale)
+    import babel
+    import babel.dates
+    return babel.dates.parse_pattern(DATETIME_PATTERNS.get(format, format)), babel.Locale.parse(locale)
+
+
+@lru_cache(maxsize=None)
+def _default_locale():
+    import babel.dates
+    return babel.dates.LC_TIME
+
+
+@lru_cache(maxsize=8192)
+def _format_datetime(value, format, locale):
+    if format in ('short', 'long') and format not in DATETIME_PATTERNS:
+        import babel.dates
+        return babel.dates.format_datetime(value, format, locale=locale)
+    pattern, locale = _datetime_pattern(format, locale)
+    if value.tzinfo is None:
+        # babel treats naive datetimes as UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return pattern.apply(value, locale)
+
+
+def format_datetime(value, format='medium', locale=None):
+    # takes datetimes directly; strings are still accepted and parsed
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    return _format_datetime(value, format, locale or _default_locale())
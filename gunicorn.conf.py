@@ -0,0 +1,42 @@
+import multiprocessing
+import os
+
+# Production server settings, picked up automatically by `gunicorn wsgi:app` from this
+# directory. Every value can be overridden from the environment.
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('BIND', '0.0.0.0:%s' % os.environ.get('PORT', '5000'))
+
+# processes x threads; threads overlap the time requests spend waiting on Postgres.
+# Each worker pools GUNICORN_THREADS + 1 connections (config.py), per database, so a host opens
+# up to workers x (threads + 1): 17 x 5 = 85 on 8 cores with the defaults, and as many again
+# to the replica when there is one. Keep that below the server's max_connections, less the
+# connections of the other hosts and of CLI commands, lowering WEB_CONCURRENCY if needed.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# import the app once in the master and fork it, so workers start fast and share memory
+preload_app = True
+
+# recycle each worker after roughly this many requests to bound slow memory growth;
+# the jitter keeps the workers from restarting all at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+# HUP (or a recycled worker) lets in-flight requests finish for up to graceful_timeout seconds
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # connections opened in the master before the fork must not be shared by the workers
+    from models import db
+    from wsgi import app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,443 @@
+import csv
+import functools
+import gzip
+import io
+import json
+import re
+import sys
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+
+# list columns (genres) are joined with this in CSV files; NDJSON files use JSON arrays
+LIST_SEPARATOR = ';'
+BATCH_SIZE = 50000
+
+
+# ----------------------------------------------------------------------------#
+# Validation.
+# ----------------------------------------------------------------------------#
+
+class _Value(object):
+    # the parts of a WTForms field that its validators touch
+    def __init__(self, data):
+        self.data = data
+        self.errors = []
+
+    def gettext(self, string):
+        return string
+
+    def ngettext(self, singular, plural, n):
+        return singular if n == 1 else plural
+
+
+# URLs WTForms' URL validator accepts, for the common case only: its own pattern, with the
+# host narrowed to ASCII labels of up to 63 characters and a letters-only TLD, so no IP
+# address or IDNA parsing is needed. Anything else goes through the validator's own check.
+_PLAIN_URL = re.compile(
+    r'^[a-z]+://'
+    r'(?=[a-z0-9.-]{1,253}(?:[:/?]|$))(?:(?=[a-z0-9-]{1,63}\.)[a-z0-9]+(?:-[a-z0-9]+)*\.)+[a-z]{2,20}'
+    r'(?::[0-9]+)?(?:\/.*?)?(?:\?.*)?$', re.IGNORECASE)
+
+
+def _required_check(validator):
+    message = validator.message if validator.message is not None else 'This field is required.'
+
+    def check(raw):
+        if raw and (not isinstance(raw, str) or raw.strip()):
+            return None
+        return (message,)
+    return check
+
+
+def _url_check(validator, cache_size):
+    message = validator.message if validator.message is not None else 'Invalid URL.'
+    match_plain, match_url = _PLAIN_URL.match, validator.regex.match
+    # the full hostname check parses IP addresses and IDNA; remembered, as links share hosts
+    validate_hostname = functools.lru_cache(cache_size)(validator.validate_hostname)
+
+    def check(raw):
+        if raw and match_plain(raw) is not None:
+            return None
+        match = match_url(raw or '')
+        if match is not None and validate_hostname(match.group('host')):
+            return None
+        return message
+    return check
+
+
+def _wtforms_check(validator):
+    from wtforms.validators import StopValidation, ValidationError
+
+    def check(raw):
+        try:
+            validator(None, _Value(raw))
+        except StopValidation as e:
+            return (e.args[0] if e.args else None,)
+        except ValidationError as e:
+            return e.args[0]
+        return None
+    return check
+
+
+def _choices_error(raw, choices):
+    # SelectMultipleField.pre_validate; SelectField's is inlined in _column_check
+    invalid = [v for v in dict.fromkeys(raw or ()) if v not in choices]
+    if not invalid:
+        return None
+    if len(invalid) == 1:
+        return "'%s' is not a valid choice for this field." % invalid[0]
+    return "'%s' are not valid choices for this field." % "', '".join(invalid)
+
+
+def _column_check(kind, validators, choices, formats, cache_size):
+    """
+    (value, error) of one column's raw value, with the first error WTForms would report:
+    parse and choice errors first, then the validators in order; a validator stopping
+    the chain (DataRequired, Optional) drops the errors before it.
+    """
+    from wtforms.validators import URL, DataRequired
+    required = None
+    if validators and type(validators[0]) is DataRequired:
+        # most columns start with it: inlined below
+        required = validators[0].message if validators[0].message is not None else 'This field is required.'
+        validators = validators[1:]
+    # a check returns None, a message, or a 1-tuple holding the message of StopValidation
+    checks = tuple(_required_check(v) if type(v) is DataRequired else
+                   _url_check(v, cache_size) if type(v) is URL else _wtforms_check(v) for v in validators)
+
+    def check(raw):
+        first = None
+        if kind == 'datetime':
+            # like DateTimeField, the validators see the parsed value, None when it does not parse
+            parsed = _parse_datetime(raw, formats) if raw is not None else None
+            if raw is not None and parsed is None:
+                first = 'Not a valid datetime value.'
+            raw = parsed
+        elif choices is not None:
+            first = _choices_error(raw, choices) if kind == 'list' else \
+                None if raw in choices else 'Not a valid choice.'
+        if required is not None and not (raw and (not isinstance(raw, str) or raw.strip())):
+            return None, required or None
+        for extra in checks:
+            error = extra(raw)
+            if type(error) is tuple:
+                return None, error[0] or None
+            if first is None:
+                first = error
+        if first is not None or raw in (None, '', []):
+            return None, first
+        return tuple(raw) if kind == 'list' else raw, None
+    return check
+
+
+class RowValidator(object):
+    """
+    Check import rows against the validators and choices declared on a WTForms form
+    class, so a bulk import accepts exactly what the create forms accept. The rules
+    are read from the form class once; rows are checked without building a form.
+    DataRequired and URL, the validators the forms use, are replaced by precompiled
+    checks with the same outcome and messages; any other validator is called as is.
+    """
+
+    # verdicts are remembered per value for list and datetime columns: genres repeat a lot
+    cache_size = 10000
+
+    def __init__(self, form_class, columns):
+        from wtforms import DateTimeField, SelectField, SelectMultipleField
+        self.rules = []
+        for column in columns:
+            field = getattr(form_class, column)
+            choices = field.kwargs.get('choices')
+            kind = 'str'
+            if issubclass(field.field_class, SelectMultipleField):
+                kind = 'list'
+            elif issubclass(field.field_class, DateTimeField):
+                kind = 'datetime'
+            formats = field.kwargs.get('format', '%Y-%m-%d %H:%M:%S')
+            if choices and issubclass(field.field_class, SelectField):
+                choices = frozenset(value for value, _ in choices)
+            else:
+                choices = None
+            check = _column_check(kind, list(field.kwargs.get('validators') or ()), choices,
+                                  formats if isinstance(formats, list) else [formats], self.cache_size)
+            self.rules.append((column, kind, check, {} if kind != 'str' else None))
+
+    def __call__(self, row):
+        """Return (values, errors): the cleaned column values, or the list of problems."""
+        values, errors = {}, []
+        for column, kind, check, cache in self.rules:
+            raw = row.get(column)
+            if kind == 'list':
+                if isinstance(raw, str):
+                    raw = [v.strip() for v in raw.split(LIST_SEPARATOR) if v.strip()]
+                key = tuple(raw) if isinstance(raw, list) else raw
+            elif raw is not None and not isinstance(raw, str):
+                raw = key = str(raw)
+            else:
+                key = raw
+            if cache is None:
+                value, error = check(raw)
+            else:
+                try:
+                    value, error = cache[key]
+                except KeyError:
+                    value, error = cache[key] = check(raw)
+                    if len(cache) > self.cache_size:
+                        cache.clear()
+                except TypeError:  # unhashable NDJSON value
+                    value, error = check(raw)
+            if error:
+                errors.append('%s: %s' % (column, error))
+            else:
+                values[column] = value
+        return values, errors
+
+
+def _parse_datetime(value, formats):
+    for format in formats:
+        try:
+            return datetime.strptime(value, format)
+        except ValueError:
+            pass
+    return None
+
+
+# ----------------------------------------------------------------------------#
+# Targets.
+# ----------------------------------------------------------------------------#
+
+def _upsert_by_name(table, columns):
+    # DISTINCT ON keeps the last row per name, ON CONFLICT may not touch a row twice
+    return ('INSERT INTO "{table}" ({cols}) '
+            'SELECT DISTINCT ON (name) {cols} FROM staging ORDER BY name, line DESC '
+            'ON CONFLICT (name) DO UPDATE SET {updates}').format(
+        table=table, cols=', '.join(columns),
+        updates=', '.join(['%s = EXCLUDED.%s' % (c, c) for c in columns if c != 'name']
+                          + ["updated_at = timezone('utc', now())"]))
+
+
+def _bump_name_version(kind):
+    # tells the workers' autocomplete indexes to rebuild (see queries.name_index); it comes
+    # before the upsert, whose row count is the number of rows merged
+    return 'UPDATE "NameIndexVersion" SET version = version + 1 WHERE kind = \'%s\'' % kind
+
+
+VENUE_COLUMNS = ('name', 'city', 'state', 'address', 'phone', 'genres', 'image_link', 'website', 'facebook_link',
+                 'seeking_talent', 'seeking_description')
+ARTIST_COLUMNS = ('name', 'city', 'state', 'phone', 'genres', 'image_link', 'website', 'facebook_link',
+                  'seeking_venue', 'seeking_description')
+SHOW_COLUMNS = ('venue_id', 'artist_id', 'venue_name', 'artist_name', 'start_time')
+
+TARGETS = {
+    'venues': {
+        'form': 'VenueForm',
+        'columns': VENUE_COLUMNS,
+        'validated': VENUE_COLUMNS,
+        'staging': ', '.join('%s %s' % (c, 'text[]' if c == 'genres' else 'text') for c in VENUE_COLUMNS),
+        'merge': [_bump_name_version('venues'), _upsert_by_name('Venue', VENUE_COLUMNS)],
+    },
+    'artists': {
+        'form': 'ArtistForm',
+        'columns': ARTIST_COLUMNS,
+        'validated': ARTIST_COLUMNS,
+        'staging': ', '.join('%s %s' % (c, 'text[]' if c == 'genres' else 'text') for c in ARTIST_COLUMNS),
+        'merge': [_bump_name_version('artists'), _upsert_by_name('Artist', ARTIST_COLUMNS)],
+    },
+    'shows': {
+        'form': 'ShowForm',
+        'columns': SHOW_COLUMNS,
+        'validated': ('venue_id', 'artist_id', 'start_time'),  # names are checked by _show_refs
+        'staging': 'venue_id integer, artist_id integer, venue_name text, artist_name text, start_time timestamp',
+        'merge': [
+            # resolve names to ids for the whole batch at once
+            'UPDATE staging s SET venue_id = v.id FROM "Venue" v WHERE s.venue_id IS NULL AND v.name = s.venue_name',
+            'UPDATE staging s SET artist_id = a.id FROM "Artist" a '
+            'WHERE s.artist_id IS NULL AND a.name = s.artist_name',
+            # shows have no natural key; an identical (venue, artist, start) is not inserted twice
+            'INSERT INTO "Show" (venue_id, artist_id, venue_name, artist_name, start_time) '
+            'SELECT DISTINCT v.id, a.id, v.name, a.name, s.start_time FROM staging s '
+            'JOIN "Venue" v ON v.id = s.venue_id JOIN "Artist" a ON a.id = s.artist_id '
+            'WHERE NOT EXISTS (SELECT 1 FROM "Show" x '
+            'WHERE x.venue_id = v.id AND x.artist_id = a.id AND x.start_time = s.start_time)',
+        ],
+        'unresolved': 'SELECT line, venue_id, venue_name, artist_id, artist_name FROM staging s WHERE NOT EXISTS (SELECT 1 FROM "Venue" v WHERE v.id = s.venue_id) '
+                      'OR NOT EXISTS (SELECT 1 FROM "Artist" a WHERE a.id = s.artist_id) ORDER BY line',
+    },
+}
+
+
+# ----------------------------------------------------------------------------#
+# Reading and COPY.
+# ----------------------------------------------------------------------------#
+
+def read_rows(path, format=None):
+    """Yield (line number, row dict) from a CSV or NDJSON file, gzipped or not; '-' is stdin."""
+    name = path[:-3] if path.endswith('.gz') else path
+    format = format or ('csv' if name.endswith('.csv') else 'ndjson')
+    if path == '-':
+        stream = sys.stdin
+    elif path.endswith('.gz'):
+        stream = gzip.open(path, 'rt', newline='', encoding='utf-8')
+    else:
+        stream = open(path, newline='', encoding='utf-8')
+    with stream:
+        if format == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(stream, 1):
+                if line.strip():
+                    yield number, json.loads(line)
+
+
+@functools.lru_cache(1024)
+def _array_literal(values):
+    return '{%s}' % ','.join('"%s"' % v.replace('\\', '\\\\').replace('"', '\\"') for v in values)
+
+
+def _copy(cursor, sql, buffer):
+    buffer.seek(0)
+    if hasattr(cursor, 'copy_expert'):  # psycopg2
+        cursor.copy_expert(sql, buffer)
+    else:  # psycopg 3
+        with cursor.copy(sql) as copy:
+            for chunk in iter(lambda: buffer.read(1 << 16), ''):
+                copy.write(chunk)
+
+
+class Importer(object):
+    """
+    Stream rows of one target into Postgres: validate each row, buffer ``batch_size``
+    valid rows as CSV, COPY them into a temporary staging table and merge the staging
+    table into the real one with set-based SQL, one transaction per batch. Memory is
+    bounded by the batch size whatever the size of the input.
+    """
+
+    def __init__(self, connection, target, batch_size=BATCH_SIZE, rejects=None, progress=None):
+        import forms
+        self.connection = connection
+        self.target = TARGETS[target]
+        self.columns = self.target['columns']
+        self.validate = RowValidator(getattr(forms, self.target['form']), self.target['validated'])
+        self.shows = target == 'shows'
+        self.batch_size = batch_size
+        self.rejects = rejects
+        self.progress = progress
+        self.read = self.merged = self.rejected = 0
+        self.started = time.perf_counter()
+
+    def run(self, rows):
+        cursor = self.connection.cursor()
+        cursor.execute('CREATE TEMPORARY TABLE IF NOT EXISTS staging (line bigint, %s) ON COMMIT DELETE ROWS'
+                       % self.target['staging'])
+        self.connection.commit()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        pending = 0
+        for number, row in rows:
+            self.read += 1
+            values, errors = self.validate(row)
+            if self.shows and not errors:
+                errors = self._show_refs(row, values)
+            if errors:
+                self._reject(number, row, errors)
+                continue
+            writer.writerow([number] + [self._cell(values.get(c)) for c in self.columns])
+            pending += 1
+            if pending == self.batch_size:
+                self._flush(cursor, buffer)
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        if pending:
+            self._flush(cursor, buffer)
+        cursor.close()
+        return self
+
+    def _show_refs(self, row, values):
+        errors = []
+        for kind in ('venue', 'artist'):
+            id, name = values.get(kind + '_id'), row.get(kind + '_name')
+            if id:
+                try:
+                    values[kind + '_id'] = int(id)
+                except ValueError:
+                    errors.append('%s_id: Not a valid integer.' % kind)
+            elif name:
+                values[kind + '_name'] = name
+            else:
+                errors.append('%s_id or %s_name is required.' % (kind, kind))
+        return errors
+
+    @staticmethod
+    def _cell(value):
+        if isinstance(value, tuple):
+            return _array_literal(value)
+        if isinstance(value, datetime):
+            return value.isoformat(' ')
+        return value
+
+    def _flush(self, cursor, buffer):
+        _copy(cursor, 'COPY staging (line, %s) FROM STDIN WITH (FORMAT csv)' % ', '.join(self.columns), buffer)
+        for sql in self.target['merge']:
+            cursor.execute(sql)
+        merged = cursor.rowcount
+        if 'unresolved' in self.target:
+            cursor.execute(self.target['unresolved'])
+            for line, venue_id, venue_name, artist_id, artist_name in cursor.fetchall():
+                self._reject(line, {'venue_id': venue_id, 'venue_name': venue_name,
+                                    'artist_id': artist_id, 'artist_name': artist_name},
+                             ['venue or artist not found'])
+        self.connection.commit()
+        self.merged += merged
+        if self.progress:
+            self.progress(self)
+
+    def _reject(self, line, row, errors):
+        self.rejected += 1
+        if self.rejects is not None:
+            self.rejects.write(json.dumps({'line': line, 'errors': errors, 'row': row}) + '\n')
+
+    @property
+    def rate(self):
+        return self.read / max(time.perf_counter() - self.started, 1e-9)
+
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+def _report(importer):
+    click.echo('\r%d read, %d merged, %d rejected, %d rows/s' % (
+        importer.read, importer.merged, importer.rejected, importer.rate), err=True, nl=False)
+
+
+@click.command('import')
+@click.argument('target', type=click.Choice(sorted(TARGETS)))
+@click.argument('path')
+@click.option('--format', type=click.Choice(['csv', 'ndjson']), help='Default: from the file extension.')
+@click.option('--batch-size', default=BATCH_SIZE, show_default=True, help='Rows per COPY and transaction.')
+@click.option('--rejects', type=click.File('w'), help='Write rejected rows and their errors here as NDJSON.')
+@with_appcontext
+def import_command(target, path, format, batch_size, rejects):
+    """Bulk-load TARGET (venues, artists or shows) from a CSV or NDJSON file.
+
+    Venues and artists are upserted by name. Shows reference their venue and artist
+    by venue_id/artist_id or venue_name/artist_name; rows whose references do not
+    resolve are rejected. Import venues and artists before their shows. PATH may be
+    gzipped, or '-' for standard input; list columns (genres) are ';'-separated in CSV.
+    """
+    from models import db
+    connection = db.engine.raw_connection()
+    try:
+        importer = Importer(connection, target, batch_size, rejects=rejects, progress=_report).run(
+            read_rows(path, format))
+    finally:
+        connection.close()
+    click.echo('', err=True)
+    click.echo('%s: %d rows read, %d merged, %d rejected in %.1fs' % (
+        target, importer.read, importer.merged, importer.rejected, time.perf_counter() - importer.started))
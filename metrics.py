@@ -0,0 +1,199 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in labels)
+
+
+class Metrics(object):
+    """
+    Prometheus-style counters, gauges and histograms.
+
+    Each thread records into its own shard, so the hot path never takes a lock;
+    shards are only summed when ``render()`` is called by a scrape. Label sets are
+    passed as tuples of (name, value) pairs.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, kind, help):
+        self._help[name] = (kind, help)
+
+    def collector(self, fn):
+        # fn() returns [(name, labels, value)], evaluated at scrape time for gauges such as pool size
+        self._collectors.append(fn)
+        return fn
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})  # (counters and gauges, histograms)
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        values = self._shard()[0]
+        key = (name, labels)
+        values[key] = values.get(key, 0) + value
+
+    def dec(self, name, labels=(), value=1):
+        self.inc(name, labels, -value)
+
+    def observe(self, name, labels, value):
+        histograms = self._shard()[1]
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            # one slot per bucket plus +Inf, then sum and count
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        histogram[bisect_left(self.buckets, value)] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def render(self):
+        with self._lock:
+            shards = list(self._shards)
+        values, histograms = {}, {}
+        for shard_values, shard_histograms in shards:
+            for key, value in shard_values.copy().items():
+                values[key] = values.get(key, 0) + value
+            for key, histogram in shard_histograms.copy().items():
+                total = histograms.setdefault(key, [0] * len(histogram))
+                for i, v in enumerate(list(histogram)):
+                    total[i] += v
+        for collect in self._collectors:
+            for name, labels, value in collect():
+                values[(name, labels)] = value
+
+        lines, seen = [], set()
+
+        def header(name, default_kind):
+            if name not in seen:
+                seen.add(name)
+                kind, help = self._help.get(name, (default_kind, name))
+                lines.append('# HELP %s %s' % (name, help))
+                lines.append('# TYPE %s %s' % (name, kind))
+
+        for (name, labels), value in sorted(values.items()):
+            header(name, 'gauge')
+            lines.append('%s%s %s' % (name, _labels(labels), repr(float(value))))
+        for (name, labels), histogram in sorted(histograms.items()):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), histogram):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append('%s_bucket%s %d' % (name, _labels(labels + (('le', le),)), cumulative))
+            lines.append('%s_sum%s %s' % (name, _labels(labels), repr(float(histogram[-2]))))
+            lines.append('%s_count%s %d' % (name, _labels(labels), histogram[-1]))
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_app(app, metrics):
+    """Record request latency, in-flight requests and template render time for ``app``."""
+    metrics.describe('fyyur_request_duration_seconds', 'histogram', 'Request latency by endpoint.')
+    metrics.describe('fyyur_requests_total', 'counter', 'Requests by endpoint and status.')
+    metrics.describe('fyyur_requests_in_flight', 'gauge', 'Requests currently being served.')
+    metrics.describe('fyyur_template_render_seconds', 'histogram', 'Template render time.')
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        metrics.inc('fyyur_requests_in_flight')
+
+    def _record(endpoint, method, status, started):
+        metrics.dec('fyyur_requests_in_flight')
+        metrics.observe('fyyur_request_duration_seconds', (('endpoint', endpoint), ('method', method)),
+                        time.perf_counter() - started)
+        metrics.inc('fyyur_requests_total', (('endpoint', endpoint), ('method', method), ('status', str(status))))
+
+    @app.after_request
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        if response.is_streamed and 'metrics_started' in g:
+            # a streamed body is generated after teardown, so the request ends when the
+            # response is closed; teardown then finds nothing left to record
+            response.call_on_close(functools.partial(_record, request.endpoint or 'unmatched', request.method,
+                                                     response.status_code, g.pop('metrics_started')))
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(exc):
+        # nothing left for a streamed response, whose request is also torn down twice
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        _record(request.endpoint or 'unmatched', request.method,
+                g.get('metrics_status', 500 if exc is not None else 200), started)
+
+    def _before_render(sender, template, context, **extra):
+        g.setdefault('metrics_templates', []).append(time.perf_counter())
+
+    def _rendered(sender, template, context, **extra):
+        started = g.get('metrics_templates')
+        if started:
+            metrics.observe('fyyur_template_render_seconds', (('template', template.name or '?'),),
+                            time.perf_counter() - started.pop())
+
+    before_render_template.connect(_before_render, app, weak=False)
+    template_rendered.connect(_rendered, app, weak=False)
+
+
+def instrument_pool(engine, metrics, name='primary'):
+    """
+    Record checkouts and checkout wait time of ``engine``'s pool; report its size on scrape.
+
+    Nothing holds on to the pool itself: ``engine.dispose()`` (see post_fork in
+    gunicorn.conf.py) replaces it, and the new pool keeps the event listeners.
+    """
+    labels = (('pool', name),)
+    metrics.describe('fyyur_db_pool_checkouts_total', 'counter', 'Connections checked out of the pool.')
+    metrics.describe('fyyur_db_pool_checkout_wait_seconds', 'histogram', 'Time spent waiting for a pooled connection.')
+    metrics.describe('fyyur_db_pool_connections_total', 'counter', 'New DBAPI connections opened by the pool.')
+    metrics.describe('fyyur_db_pool_size', 'gauge', 'Configured pool size.')
+    metrics.describe('fyyur_db_pool_checked_out', 'gauge', 'Connections currently checked out.')
+    metrics.describe('fyyur_db_pool_overflow', 'gauge', 'Connections open beyond the pool size.')
+
+    connect = engine.connect
+
+    def timed_connect():
+        # sessions get their connection through Engine.connect, which waits for the pool
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            metrics.observe('fyyur_db_pool_checkout_wait_seconds', labels, time.perf_counter() - started)
+
+    engine.connect = timed_connect
+    event.listen(engine, 'checkout', lambda *args: metrics.inc('fyyur_db_pool_checkouts_total', labels))
+    event.listen(engine, 'connect', lambda *args: metrics.inc('fyyur_db_pool_connections_total', labels))
+
+    @metrics.collector
+    def _pool_gauges():
+        pool, gauges = engine.pool, []
+        for metric, attr in (('fyyur_db_pool_size', 'size'), ('fyyur_db_pool_checked_out', 'checkedout'),
+                             ('fyyur_db_pool_overflow', 'overflow')):
+            if hasattr(pool, attr):  # QueuePool has all three; NullPool and friends do not
+                gauges.append((metric, labels, getattr(pool, attr)()))
+        return gauges
@@ -0,0 +1,38 @@
+"""updated_at columns on Venue, Artist and Show
+
+Revision ID: 3f7a9c2e5b18
+Revises: 8e2b4c6d1a37
+Create Date: 2026-10-18 19:02:44.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7a9c2e5b18'
+down_revision = '8e2b4c6d1a37'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist', 'Show')
+
+
+def upgrade():
+    # now() is stable, so Postgres stores the default for existing rows without rewriting the tables
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                       server_default=sa.text("timezone('utc', now())")))
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index('ix_%s_updated_at' % table, table, ['updated_at'], unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.drop_index('ix_%s_updated_at' % table, table_name=table, postgresql_concurrently=True,
+                          if_exists=True)
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
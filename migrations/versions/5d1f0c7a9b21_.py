@@ -0,0 +1,31 @@
+"""trigram indexes for name search
+
+Revision ID: 5d1f0c7a9b21
+Revises: c24c843127e7
+Create Date: 2026-10-18 10:12:41.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1f0c7a9b21'
+down_revision = 'c24c843127e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GIN trigram indexes let Postgres answer name ILIKE '%term%' and similarity()
+    # ranking from the index instead of a sequential scan
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_Venue_name_trgm', 'Venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_Artist_name_trgm', 'Artist', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_Artist_name_trgm', table_name='Artist')
+    op.drop_index('ix_Venue_name_trgm', table_name='Venue')
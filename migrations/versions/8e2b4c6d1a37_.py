@@ -0,0 +1,50 @@
+"""composite indexes on Show for time-window queries
+
+Revision ID: 8e2b4c6d1a37
+Revises: 5d1f0c7a9b21
+Create Date: 2026-10-18 11:03:17.285940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2b4c6d1a37'
+down_revision = '5d1f0c7a9b21'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ('ix_Show_venue_id_start_time', ['venue_id', 'start_time']),
+    ('ix_Show_artist_id_start_time', ['artist_id', 'start_time']),
+    ('ix_Show_start_time', ['start_time', 'id']),
+)
+
+
+def _index_valid(name):
+    # None when the index does not exist. A CREATE INDEX CONCURRENTLY that failed or was
+    # cancelled leaves an INVALID index behind, which the planner never uses.
+    return op.get_bind().execute(sa.text(
+        'SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name'),
+        {'name': name}).scalar()
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, and it does not
+    # hold a write lock on "Show" while the index builds
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            valid = _index_valid(name)
+            if valid:
+                continue
+            if valid is not None:
+                op.drop_index(name, table_name='Show', postgresql_concurrently=True)
+            op.create_index(name, 'Show', columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in reversed(INDEXES):
+            op.drop_index(name, table_name='Show', postgresql_concurrently=True, if_exists=True)
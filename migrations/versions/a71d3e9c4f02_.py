@@ -0,0 +1,28 @@
+"""NameIndexVersion: change marker of the venue and artist names
+
+Revision ID: a71d3e9c4f02
+Revises: 3f7a9c2e5b18
+Create Date: 2026-10-18 21:14:09.603518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a71d3e9c4f02'
+down_revision = '3f7a9c2e5b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table = op.create_table('NameIndexVersion',
+                            sa.Column('kind', sa.String(length=20), nullable=False),
+                            sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+                            sa.PrimaryKeyConstraint('kind'))
+    op.bulk_insert(table, [{'kind': 'venues', 'version': 0}, {'kind': 'artists', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('NameIndexVersion')
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+
+from flask_sqlalchemy import SQLAlchemy
+
+from db_routing import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def updated_at_column():
+    # stamped by SQLAlchemy on every ORM insert and update; the server default covers raw SQL inserts
+    return db.Column(db.DateTime(), nullable=False, index=True, default=utcnow, onupdate=utcnow,
+                     server_default=db.text("timezone('utc', now())"))
+
+
+# ----------------------------------------------------------------------------#
+# Models.
+# ----------------------------------------------------------------------------#
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False, unique=True)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    address = db.Column(db.String(120), nullable=False)
+    genres = db.Column(db.ARRAY(db.String(), dimensions=1), nullable=False)
+    phone = db.Column(db.String(120), nullable=False)
+    image_link = db.Column(db.String(500), nullable=False)
+    website = db.Column(db.String(), nullable=False)
+    facebook_link = db.Column(db.String(120), nullable=False)
+    seeking_talent = db.Column(db.String(50), nullable=True, default=True)
+    seeking_description = db.Column(db.String(120), nullable=False,
+                                    default='We are looking for an exciting artist to perform here!')
+    updated_at = updated_at_column()
+    reltion_Venue_id = db.relationship('Show', backref='Venue',lazy=True,foreign_keys = [id,name], primaryjoin="Venue.id == Show.venue_id")
+
+    def __repr__(self):
+        return f'<Venue Name: {self.name}, City: {self.city}, State: {self.state}>'
+
+    @property
+    def city_and_state(self):
+        return {'city': self.city, 'state': self.state, }
+
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False, unique=True)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120), nullable=False)
+    genres = db.Column(db.ARRAY(db.String(), dimensions=1), nullable=False)
+    image_link = db.Column(db.String(500), nullable=False)
+    website = db.Column(db.String(), nullable=True)
+    facebook_link = db.Column(db.String(120), nullable=True)
+    seeking_venue = db.Column(db.String(50), nullable=False, default=True)
+    seeking_description = db.Column(db.String(120), nullable=False,
+                                    default='We are looking to perform at an exciting venue!')
+    updated_at = updated_at_column()
+    relation_artist_id = db.relationship('Show', backref='Artist', lazy=True,foreign_keys = [id,name],primaryjoin="Artist.id == Show.artist_id")
+
+    def __repr__(self):
+        return f'<Artist Name: {self.name}, City: {self.city}, State: {self.state}>'
+
+    @property
+    def basic_details(self):
+        return {'id': self.id, 'name': self.name, 'city': self.city, 'state': self.state}
+
+class Show(db.Model):
+    __tablename__ = "Show"
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        # (start_time, id) is the keyset pagination key of /shows
+        db.Index('ix_Show_start_time', 'start_time', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=True)  # False
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=True)  # False
+    venue_name = db.Column(db.String, db.ForeignKey('Venue.name'), nullable=True)  # False
+    artist_name = db.Column(db.String, db.ForeignKey('Artist.name'), nullable=True)  # False
+    start_time = db.Column(db.DateTime(),nullable=True)
+    updated_at = updated_at_column()
+
+
+class NameIndexVersion(db.Model):
+    # one row per kind ('venues', 'artists'), bumped in the transaction of every write to
+    # the names, so a worker can tell with one primary key lookup that its name index is stale
+    __tablename__ = 'NameIndexVersion'
+    kind = db.Column(db.String(20), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
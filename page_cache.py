@@ -0,0 +1,209 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from threading import Lock
+
+from flask import Response, current_app, g, make_response, request, session
+
+
+class PageCache(object):
+    """
+    Bounded LRU cache of rendered pages with a TTL and tag-based invalidation.
+
+    The least recently used entries are evicted once there are more than
+    ``max_entries`` of them or their sizes add up to more than ``max_total_bytes``;
+    an entry larger than ``max_bytes`` is not stored at all. Every entry carries a set of tags (e.g. ``venue:3``, ``shows``) describing the
+    data it was rendered from; ``invalidate()`` drops exactly the entries holding
+    any of the given tags. An entry may also expire earlier than the TTL, which is
+    how pages are retired when an upcoming show becomes a past one.
+    """
+
+    def __init__(self, max_entries=512, ttl=300, max_bytes=None, max_total_bytes=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_total_bytes = max_total_bytes
+        self._entries = OrderedDict()  # key -> (value, tags, expires_at, size)
+        self._tags = {}  # tag -> set of keys
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self.invalidated_at = 0.0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= time.time():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, tags=(), expires_at=None, size=0):
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            self._drop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, frozenset(tags), deadline, size)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or \
+                    (self.max_total_bytes is not None and self._bytes > self.max_total_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self.invalidated_at = time.time()
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[3]
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+def init_page_cache(app, metrics=None):
+    app.config.setdefault('PAGE_CACHE_ENABLED', True)
+    app.config.setdefault('PAGE_CACHE_SIZE', 512)
+    app.config.setdefault('PAGE_CACHE_TTL', 300)
+    app.config.setdefault('PAGE_CACHE_MAX_BYTES', 1024 * 1024)
+    app.config.setdefault('PAGE_CACHE_MAX_TOTAL_BYTES', 64 * 1024 * 1024)
+    page_cache = app.extensions['page_cache'] = PageCache(app.config['PAGE_CACHE_SIZE'],
+                                                          app.config['PAGE_CACHE_TTL'],
+                                                          app.config['PAGE_CACHE_MAX_BYTES'],
+                                                          app.config['PAGE_CACHE_MAX_TOTAL_BYTES'])
+    if metrics is not None:
+        metrics.describe('fyyur_page_cache_entries', 'gauge', 'Pages currently cached.')
+        metrics.describe('fyyur_page_cache_bytes', 'gauge', 'Bytes of cached pages.')
+        for name in ('hits', 'misses', 'evictions', 'invalidations'):
+            metrics.describe('fyyur_page_cache_%s' % name, 'counter', 'Page cache %s.' % name)
+
+        @metrics.collector
+        def _page_cache_metrics():
+            stats = page_cache.stats()
+            return [('fyyur_page_cache_%s' % name, (), stats[name])
+                    for name in ('entries', 'bytes', 'hits', 'misses', 'evictions', 'invalidations')]
+    return page_cache
+
+
+def cache_tags(*tags):
+    # record which rows the page being rendered depends on
+    g.setdefault('cache_tags', set()).update(tags)
+
+
+def cache_until(moment):
+    # the page must not outlive ``moment`` (e.g. the next upcoming show turning into a past one)
+    if moment is not None and (g.get('cache_until') is None or moment < g.cache_until):
+        g.cache_until = moment
+
+
+def invalidate_pages(*tags):
+    current_app.extensions['page_cache'].invalidate(*tags)
+
+
+def cached_page(view):
+    """
+    Serve a GET page from the app's page cache, keyed by path and query string, and by
+    the state of the rows the page shows when a @conditional probe has measured it. The
+    view declares its dependencies with cache_tags()/cache_until(); pages rendered
+    while flash messages are pending are never stored or served from the cache.
+    A streamed page is stored once it has been sent. Pages larger than
+    ``PAGE_CACHE_MAX_BYTES`` are not stored, streamed or not.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config['PAGE_CACHE_ENABLED'] or '_flashes' in session:
+            return view(*args, **kwargs)
+        page_cache = current_app.extensions['page_cache']
+        key = request.full_path
+        if g.get('page_version'):
+            key = '%s#%s' % (key, g.page_version)
+        cached = page_cache.get(key)
+        if cached is not None:
+            body, mimetype = cached
+            response = Response(body, mimetype=mimetype)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+        response = make_response(view(*args, **kwargs))
+        # right after a write the replica may still be behind, so do not keep pages read from it
+        replica_lagging = g.get('db_replica') and \
+            time.time() - page_cache.invalidated_at < current_app.config.get('REPLICA_STICKY_SECONDS', 0)
+        if response.status_code == 200 and not replica_lagging:
+            expires_at = None
+            if g.get('cache_until') is not None:
+                expires_at = time.time() + (g.cache_until - datetime.now()).total_seconds()
+            tags = g.get('cache_tags', ())
+            if response.is_streamed:
+                response.response = _stored_when_sent(response.response, page_cache,
+                                                       (key, response.mimetype, tags, expires_at),
+                                                       page_cache.max_bytes)
+            else:
+                body = response.get_data()
+                page_cache.set(key, (body, response.mimetype), tags, expires_at, len(body))
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+def _stored_when_sent(chunks, page_cache, entry, limit):
+    # runs outside the request context: everything it needs is passed in
+    key, mimetype, tags, expires_at = entry
+    started = page_cache.invalidated_at
+    body, size = [], 0
+    try:
+        for chunk in chunks:
+            if body is not None:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                size += len(chunk)
+                if limit is None or size <= limit:
+                    body.append(chunk)
+                else:
+                    body = None
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    # a write while the page was being read may have made it stale already
+    if body is not None and page_cache.invalidated_at == started:
+        page_cache.set(key, (b''.join(body), mimetype), tags, expires_at, size)
@@ -0,0 +1,125 @@
+import functools
+import hmac
+import os
+import random
+import sys
+import threading
+from collections import Counter
+
+from flask import g, request
+
+
+class _StackSampler(threading.Thread):
+    """Sample the stack of one thread every ``interval`` seconds until stopped."""
+
+    def __init__(self, thread_id, interval):
+        super(_StackSampler, self).__init__(name='fyyur-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s:%s' % (os.path.basename(code.co_filename), code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.stacks
+
+
+class RequestProfiler(object):
+    """
+    Opt-in sampling profiler for live requests.
+
+    With ``PROFILER_ENABLED`` on, a ``PROFILER_SAMPLE_RATE`` fraction of requests,
+    plus any request whose ``PROFILER_HEADER`` matches ``PROFILER_TOKEN``, has its
+    stack sampled every ``PROFILER_INTERVAL`` seconds. Samples are appended as
+    collapsed stacks (the input format of flamegraph.pl and speedscope) to
+    ``PROFILER_DIR/<endpoint>.collapsed``, rotated once a file reaches
+    ``PROFILER_MAX_BYTES``. Unprofiled requests pay for one random() call.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILER_ENABLED', False)
+        app.config.setdefault('PROFILER_SAMPLE_RATE', 0.0)
+        app.config.setdefault('PROFILER_HEADER', 'X-Profile')
+        app.config.setdefault('PROFILER_TOKEN', None)
+        app.config.setdefault('PROFILER_INTERVAL', 0.005)
+        app.config.setdefault('PROFILER_DIR', os.path.join(app.root_path, 'profiles'))
+        app.config.setdefault('PROFILER_MAX_BYTES', 10 * 1024 * 1024)
+        app.config.setdefault('PROFILER_BACKUP_COUNT', 3)
+        app.before_request(self._start)
+        app.after_request(self._mark)
+        app.teardown_request(self._finish)
+        self.app = app
+
+    def _wanted(self):
+        config = self.app.config
+        token = config['PROFILER_TOKEN']
+        header = request.headers.get(config['PROFILER_HEADER'])
+        if token and header and hmac.compare_digest(header.encode(), token.encode()):
+            return True
+        return random.random() < config['PROFILER_SAMPLE_RATE']
+
+    def _start(self):
+        if not self.app.config['PROFILER_ENABLED'] or not self._wanted():
+            return
+        sampler = _StackSampler(threading.get_ident(), self.app.config['PROFILER_INTERVAL'])
+        sampler.start()
+        g.profiler = sampler
+
+    def _mark(self, response):
+        if 'profiler' in g:
+            response.headers['X-Profiled'] = request.endpoint or 'unmatched'
+            if response.is_streamed:
+                # keep sampling while the body is generated, after the request is torn down
+                response.call_on_close(functools.partial(self._stop, g.pop('profiler'),
+                                                         request.endpoint or 'unmatched'))
+        return response
+
+    def _finish(self, exc):
+        sampler = g.pop('profiler', None)
+        if sampler is not None:
+            self._stop(sampler, request.endpoint or 'unmatched')
+
+    def _stop(self, sampler, endpoint):
+        stacks = sampler.stop()
+        if stacks:
+            self._write(endpoint, stacks)
+
+    def _write(self, endpoint, stacks):
+        config = self.app.config
+        directory = config['PROFILER_DIR']
+        path = os.path.join(directory, '%s.collapsed' % endpoint.replace('/', '_'))
+        lines = ''.join('%s %d\n' % item for item in stacks.items())
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) + len(lines) > config['PROFILER_MAX_BYTES']:
+                self._rotate(path, config['PROFILER_BACKUP_COUNT'])
+            with open(path, 'a') as out:
+                out.write(lines)
+
+    @staticmethod
+    def _rotate(path, backups):
+        # same scheme as logging.handlers.RotatingFileHandler: x -> x.1 -> x.2 ...
+        for i in range(backups - 1, 0, -1):
+            if os.path.exists('%s.%d' % (path, i)):
+                os.replace('%s.%d' % (path, i), '%s.%d' % (path, i + 1))
+        if backups > 0:
+            os.replace(path, path + '.1')
+        else:
+            os.remove(path)
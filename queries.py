@@ -0,0 +1,271 @@
+import base64
+import json
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from flask import abort, current_app
+
+from autocomplete import PrefixIndex
+from models import db, Venue, Artist, Show, NameIndexVersion
+
+
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor'])
+
+YIELD_PER = 500  # rows fetched per round trip by a server-side cursor
+
+
+def encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _cursor_value(value, type_):
+    # a cursor comes back from the client: anything but the type of its column is rejected
+    if value is None:
+        return None
+    if isinstance(type_, db.DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(type_, db.Integer) and not isinstance(value, int) \
+            or isinstance(type_, db.Float) and not isinstance(value, (int, float)) \
+            or isinstance(type_, db.String) and not isinstance(value, str):
+        raise ValueError(value)
+    return value
+
+
+def decode_cursor(cursor, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [_cursor_value(v, c.type) for v, c in zip(values, columns)]
+    except (ValueError, TypeError):
+        abort(400)
+
+
+def keyset_window(query, columns, after=None, before=None, size=None):
+    """
+    ``query`` narrowed to the page after/before the cursor, ordered by ``columns``
+    (descending for ``before``) and limited to ``size + 1`` rows, the extra row
+    telling whether there is a page beyond.
+    """
+    size = size or current_app.config['PAGE_SIZE']
+    sort_key = db.tuple_(*columns)
+    if before:
+        bound = db.tuple_(*[db.literal(v, c.type) for v, c in zip(decode_cursor(before, columns), columns)])
+        return query.filter(sort_key < bound).order_by(*[c.desc() for c in columns]).limit(size + 1)
+    if after:
+        bound = db.tuple_(*[db.literal(v, c.type) for v, c in zip(decode_cursor(after, columns), columns)])
+        query = query.filter(sort_key > bound)
+    return query.order_by(*columns).limit(size + 1)
+
+
+def keyset_page(query, columns, after=None, before=None, size=None, key=None):
+    """
+    Fetch one page of ``query`` ordered by ``columns`` (a unique key such as
+    ``(Show.start_time, Show.id)``), seeking past the ``after``/``before`` cursor
+    instead of using OFFSET, so a deep page costs the same as the first one.
+    ``key`` extracts the sort values from a result row when they are not plain
+    attributes of it.
+    """
+    size = size or current_app.config['PAGE_SIZE']
+    if key is None:
+        key = lambda item: [getattr(item, c.key) for c in columns]
+
+    def cursor_of(item):
+        return encode_cursor(key(item))
+
+    rows = keyset_window(query, columns, after, before, size).all()
+    if before:
+        has_more = len(rows) > size
+        items = rows[:size][::-1]
+        return Page(items,
+                    cursor_of(items[-1]) if items else None,
+                    cursor_of(items[0]) if has_more else None)
+
+    items = rows[:size]
+    return Page(items,
+                cursor_of(items[-1]) if len(rows) > size else None,
+                cursor_of(items[0]) if after and items else None)
+
+
+def stream_rows(query):
+    """Run ``query`` now, reading its rows from a server-side cursor YIELD_PER at a time."""
+    return db.session.execute(query.statement, execution_options={'yield_per': YIELD_PER})
+
+
+class StreamedPage(object):
+    """
+    A keyset page whose ``items`` are read from a server-side cursor as they are
+    iterated, once. Its cursors are only known after that, which suits templates
+    putting the pager below the rows.
+    """
+
+    def __init__(self, rows, size, cursor_of, after):
+        self.next_cursor = self.prev_cursor = None
+        self.items = self._stream(rows, size, cursor_of, after)
+
+    def _stream(self, rows, size, cursor_of, after):
+        last = None
+        for count, row in enumerate(rows):
+            if count == size:
+                self.next_cursor = cursor_of(last)
+                break
+            if count == 0 and after:
+                self.prev_cursor = cursor_of(row)
+            last = row
+            yield row
+
+
+def keyset_stream(query, columns, after=None, before=None, size=None, key=None):
+    """
+    keyset_page() for pages streamed to the client: the query runs now, its rows are
+    fetched YIELD_PER at a time while the page renders. A page before a cursor comes
+    out of the database backwards and is read whole, as keyset_page() does.
+    """
+    if before:
+        return keyset_page(query, columns, after, before, size, key)
+    size = size or current_app.config['PAGE_SIZE']
+    if key is None:
+        key = lambda item: [getattr(item, c.key) for c in columns]
+    rows = stream_rows(keyset_window(query, columns, after, None, size))
+    return StreamedPage(rows, size, lambda item: encode_cursor(key(item)), after)
+
+
+def _like_escape(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_by_name(model, search_term, after=None, before=None, columns=None):
+    """
+    Page through ``model`` rows whose name contains ``search_term``, best matches first.
+
+    The substring filter is served by the ``pg_trgm`` GIN index on ``name`` and rows
+    are ranked by trigram similarity, paginated on (rank, name, id) so each request
+    returns at most PAGE_SIZE results. A term shorter than SEARCH_MIN_LENGTH has no
+    trigram to look up, so it matches the start of names instead, in name order.
+    With ``columns`` only those are selected and the page holds rows instead of model
+    instances. Returns ``(page, count, more)``: the matches are counted up to
+    SEARCH_COUNT_LIMIT, and ``more`` tells that there are more than that.
+    """
+    config = current_app.config
+    search_term = search_term.strip()
+    query = db.session.query(*(columns or [model]))
+    sort = (model.name.label('sort_name'), model.id.label('sort_id'))
+    if len(search_term) < config['SEARCH_MIN_LENGTH']:
+        matches = query.filter(model.name.ilike(_like_escape(search_term) + '%', escape='\\'))
+        page = keyset_page(matches.add_columns(*sort), (model.name, model.id), after=after, before=before,
+                           key=lambda row: [row.sort_name, row.sort_id])
+    else:
+        matches = query.filter(model.name.ilike('%' + _like_escape(search_term) + '%', escape='\\'))
+        rank = (1 - db.func.similarity(model.name, search_term, type_=db.Float)).label('rank')
+        page = keyset_page(matches.add_columns(rank, *sort), (rank, model.name, model.id),
+                           after=after, before=before,
+                           key=lambda row: [row.rank, row.sort_name, row.sort_id])
+    if columns:
+        items = [row[:len(columns)] for row in page.items]
+    else:
+        items = [row[0] for row in page.items]
+    limit = config['SEARCH_COUNT_LIMIT']
+    # counting stops one row past the limit, however many rows match
+    count = db.session.query(db.func.count()).select_from(
+        matches.with_entities(model.id).limit(limit + 1).subquery()).scalar()
+    return page._replace(items=items), min(count, limit), count > limit
+
+
+name_indexes = {'artists': PrefixIndex(), 'venues': PrefixIndex()}
+
+
+def name_index(kind):
+    # built from the database on first use and kept current by the write handlers of this
+    # process; rebuilt when the kind's NameIndexVersion row shows a write made by another
+    # worker or `flask import`. The row is read at most every NAME_INDEX_CHECK_SECONDS.
+    index = name_indexes[kind]
+    if index.ready and time.time() - index.checked_at < current_app.config.get('NAME_INDEX_CHECK_SECONDS', 5):
+        return index
+    version = db.session.query(NameIndexVersion.version).filter(NameIndexVersion.kind == kind).scalar()
+    if not index.ready or version != index.version:
+        model = Artist if kind == 'artists' else Venue
+        index.build(db.session.query(model.id, model.name).all(), version)
+    index.checked_at = time.time()
+    return index
+
+
+def bump_name_version(kind):
+    """
+    Mark the names of ``kind`` as changed, in the transaction of the write that changes
+    them, and return the new version for ``PrefixIndex.add``/``remove``. The row stays
+    locked until that transaction ends, so writers bump it one after another.
+    """
+    return db.session.execute(
+        db.update(NameIndexVersion).where(NameIndexVersion.kind == kind)
+        .values(version=NameIndexVersion.version + 1).returning(NameIndexVersion.version)).scalar()
+
+
+def _show_tile(show, artist_image_link, venue_image_link):
+    return {
+        "venue_id": show.venue_id,
+        "venue_name": show.venue_name,
+        "artist_id": show.artist_id,
+        "artist_name": show.artist_name,
+        "artist_image_link": artist_image_link,
+        "venue_image_link": venue_image_link,
+        "start_time": show.start_time
+    }
+
+
+def show_partitions(owner_column, ids, now=None, with_shows=False):
+    """
+    Partition the shows of a set of venues or artists into past and upcoming.
+
+    ``owner_column`` is ``Show.venue_id`` or ``Show.artist_id``. Every id gets an entry
+    with ``past_shows_count`` and ``upcoming_shows_count``; with ``with_shows`` the
+    entries also carry the ``past_shows``/``upcoming_shows`` tile lists. Either way a
+    single query is issued, evaluated against one ``now`` snapshot.
+    """
+    ids = set(ids)
+    if now is None:
+        now = datetime.now()
+    partitions = {}
+    for owner_id in ids:
+        partitions[owner_id] = {"past_shows_count": 0, "upcoming_shows_count": 0}
+        if with_shows:
+            partitions[owner_id].update(past_shows=[], upcoming_shows=[])
+    if not ids:
+        return partitions
+
+    if not with_shows:
+        total = db.func.count(Show.id)
+        upcoming = db.func.count(Show.id).filter(Show.start_time > now)
+        rows = db.session.query(owner_column, total, upcoming) \
+            .filter(owner_column.in_(ids)) \
+            .group_by(owner_column) \
+            .all()
+        for owner_id, total_count, upcoming_count in rows:
+            partitions[owner_id]["past_shows_count"] = total_count - upcoming_count
+            partitions[owner_id]["upcoming_shows_count"] = upcoming_count
+        return partitions
+
+    rows = db.session.query(owner_column, Show, Artist.image_link, Venue.image_link) \
+        .join(Artist, Artist.id == Show.artist_id) \
+        .join(Venue, Venue.id == Show.venue_id) \
+        .filter(owner_column.in_(ids)) \
+        .order_by(owner_column, Show.start_time, Show.id) \
+        .all()
+    for owner_id, show, artist_image_link, venue_image_link in rows:
+        entry = partitions[owner_id]
+        tile = _show_tile(show, artist_image_link, venue_image_link)
+        if show.start_time is not None and show.start_time > now:
+            entry["upcoming_shows"].append(tile)
+            entry["upcoming_shows_count"] += 1
+        else:
+            entry["past_shows"].append(tile)
+            entry["past_shows_count"] += 1
+    return partitions
+
+
+def next_show_start(now=None):
+    now = now or datetime.now()
+    return db.session.query(db.func.min(Show.start_time)).filter(Show.start_time > now).scalar()
@@ -0,0 +1,193 @@
+import os
+import random
+import secrets
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+# Flask's own session serializer (keeps tuples, bytes, Markup, datetimes), deflated
+_serializer = TaggedJSONSerializer()
+
+
+def encode(data):
+    return zlib.compress(_serializer.dumps(data).encode('utf-8'))
+
+
+def decode(blob):
+    return _serializer.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+class FilesystemSessionStore(object):
+    """One file per session: an 8-byte expiry timestamp followed by the encoded data."""
+
+    _header = struct.Struct('>Q')
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid):
+        return os.path.join(self.directory, sid)
+
+    def load(self, sid):
+        try:
+            with open(self._path(sid), 'rb') as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+        if len(blob) < self._header.size or self._header.unpack_from(blob)[0] < time.time():
+            return None
+        return decode(blob[self._header.size:])
+
+    def save(self, sid, data, expires):
+        # write then rename, so a concurrent reader in another worker never sees half a file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self._header.pack(int(expires)) + encode(data))
+        os.replace(tmp, self._path(sid))
+
+    def delete(self, sid):
+        try:
+            os.remove(self._path(sid))
+        except FileNotFoundError:
+            pass
+
+    def purge_expired(self):
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            try:
+                with open(entry.path, 'rb') as f:
+                    header = f.read(self._header.size)
+                if len(header) == self._header.size and self._header.unpack(header)[0] < now:
+                    os.remove(entry.path)
+            except (FileNotFoundError, IsADirectoryError):
+                pass
+
+
+class SQLiteSessionStore(object):
+    """Sessions in one SQLite file in WAL mode, shared by every worker on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS sessions '
+                         '(id TEXT PRIMARY KEY, expires INTEGER NOT NULL, data BLOB NOT NULL) WITHOUT ROWID')
+
+    def _connection(self):
+        # one connection per thread, reopened after a fork (gunicorn preloads the app in the master)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def load(self, sid):
+        row = self._connection().execute('SELECT data FROM sessions WHERE id = ? AND expires >= ?',
+                                         (sid, int(time.time()))).fetchone()
+        return decode(row[0]) if row else None
+
+    def save(self, sid, data, expires):
+        self._connection().execute('INSERT OR REPLACE INTO sessions (id, expires, data) VALUES (?, ?, ?)',
+                                   (sid, int(expires), encode(data)))
+
+    def delete(self, sid):
+        self._connection().execute('DELETE FROM sessions WHERE id = ?', (sid,))
+
+    def purge_expired(self):
+        self._connection().execute('DELETE FROM sessions WHERE expires < ?', (int(time.time()),))
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super(ServerSideSession, self).__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keep session data in ``store`` and only a signed, random session id in the cookie.
+
+    Any worker or node sharing the store and ``SECRET_KEY`` can serve any request, so
+    flash messages and CSRF tokens survive without sticky routing. Empty sessions are
+    never written, so anonymous page views cost one cookie check and no store access.
+    """
+
+    salt = 'fyyur-session'
+    purge_probability = 0.001  # expired entries are swept on roughly one save in a thousand
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.load(sid)
+                if data is not None:
+                    return ServerSideSession(data, sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not self.should_set_cookie(app, session):
+            return
+
+        self.store.save(session.sid, dict(session), time.time() + app.permanent_session_lifetime.total_seconds())
+        if random.random() < self.purge_probability:
+            self.store.purge_expired()
+        response.set_cookie(name, self._signer(app).sign(session.sid).decode(),
+                            expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app),
+                            secure=self.get_cookie_secure(app),
+                            samesite=self.get_cookie_samesite(app),
+                            domain=domain, path=path)
+
+
+def init_sessions(app):
+    app.config.setdefault('SESSION_BACKEND', 'cookie')
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'filesystem':
+        store = FilesystemSessionStore(app.config.get('SESSION_DIR') or os.path.join(app.root_path, 'sessions'))
+    elif backend == 'sqlite':
+        store = SQLiteSessionStore(app.config.get('SESSION_SQLITE_PATH')
+                                   or os.path.join(app.root_path, 'sessions.sqlite3'))
+    elif backend == 'cookie':
+        return  # Flask's signed cookie sessions
+    else:
+        raise ValueError('Unknown SESSION_BACKEND %r' % backend)
+    app.session_interface = ServerSideSessionInterface(store)
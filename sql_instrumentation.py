@@ -0,0 +1,125 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# collapse IN (...) lists and literals so "WHERE id IN (1, 2)" and "... IN (7)" share one shape
+_IN_LIST = re.compile(r'\(\s*(?:%\(\w+\)s|\?|\$\d+|:\w+)(?:\s*,\s*(?:%\(\w+\)s|\?|\$\d+|:\w+))*\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_SPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    shape = _IN_LIST.sub('(?)', statement)
+    shape = _LITERAL.sub('?', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# listening on the Engine class covers every engine, so the listeners are installed once per
+# process rather than once per app; each app only reads the counters its own requests leave on g
+_watchers = []
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('sql_instrumentation_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['sql_instrumentation_start'].pop()
+    if context is not None and context.execution_options.get('sql_instrumentation_skip'):
+        return
+    for watcher in _watchers:
+        watcher.append(statement)
+    if has_app_context() and 'sql_shapes' in g:
+        g.sql_count += 1
+        g.sql_time += elapsed
+        g.sql_shapes[statement_shape(statement)] += 1
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # a statement that raised never reaches after_cursor_execute, so drop its start time here,
+    # or the next statement on this connection would be timed from it
+    if context.execution_context is None or context.connection is None:
+        return
+    starts = context.connection.info.get('sql_instrumentation_start')
+    if starts:
+        starts.pop()
+
+
+class QueryInstrumentation(object):
+    """
+    Count and time the SQL statements each request runs.
+
+    Every response gets ``X-Query-Count`` and a ``Server-Timing`` header with the
+    time spent in the database and in total. A request that repeats one statement
+    shape more than ``SQL_REPEAT_THRESHOLD`` times is logged as a likely N+1.
+    ``SQL_QUERY_BUDGETS`` maps endpoints to a maximum statement count; going over
+    logs a warning, or raises QueryBudgetExceeded when ``SQL_BUDGET_STRICT`` is set
+    (it defaults to ``app.testing``), so the test suite fails.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_REPEAT_THRESHOLD', 5)
+        app.config.setdefault('SQL_QUERY_BUDGETS', {})
+        app.config.setdefault('SQL_BUDGET_STRICT', None)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        self.app = app
+
+    def _start_request(self):
+        g.sql_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_time = 0.0
+        g.sql_shapes = Counter()
+
+    def _finish_request(self, response):
+        if 'sql_shapes' not in g:
+            return response
+        total_ms = (time.perf_counter() - g.sql_started) * 1000.0
+        response.headers['X-Query-Count'] = str(g.sql_count)
+        response.headers.add('Server-Timing', 'db;dur=%.2f;desc="%d queries"' % (g.sql_time * 1000.0, g.sql_count))
+        response.headers.add('Server-Timing', 'total;dur=%.2f' % total_ms)
+
+        config = self.app.config
+        for shape, count in g.sql_shapes.most_common():
+            if count <= config['SQL_REPEAT_THRESHOLD']:
+                break
+            self.app.logger.warning('Possible N+1 on %s %s: %d runs of %s',
+                                    request.method, request.endpoint, count, shape)
+
+        budget = config['SQL_QUERY_BUDGETS'].get(request.endpoint)
+        if budget is not None and g.sql_count > budget:
+            message = '%s ran %d queries, budget is %d' % (request.endpoint, g.sql_count, budget)
+            strict = config['SQL_BUDGET_STRICT']
+            if strict or (strict is None and self.app.testing):
+                raise QueryBudgetExceeded(message)
+            self.app.logger.warning(message)
+        return response
+
+    @contextmanager
+    def assert_max_queries(self, budget):
+        # with instrumentation.assert_max_queries(3): client.get('/venues')
+        statements = []
+        _watchers.append(statements)
+        try:
+            yield statements
+        finally:
+            _watchers.remove(statements)
+        if len(statements) > budget:
+            raise QueryBudgetExceeded('%d queries ran, budget is %d:\n%s' % (
+                len(statements), budget, '\n'.join(statement_shape(s) for s in statements)))
@@ -2,3 +2,36 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Fill a <datalist> for every input with a data-autocomplete URL as the user types.
+// data-autocomplete-value="id" submits the id (ShowForm) instead of the name.
+document.addEventListener('DOMContentLoaded', function () {
+  var inputs = document.querySelectorAll('input[data-autocomplete]');
+  Array.prototype.forEach.call(inputs, function (input, n) {
+    var list = document.createElement('datalist');
+    var useIds = input.getAttribute('data-autocomplete-value') === 'id';
+    var pending;
+    list.id = 'autocomplete-' + n;
+    input.setAttribute('list', list.id);
+    input.setAttribute('autocomplete', 'off');
+    input.parentNode.appendChild(list);
+    input.addEventListener('input', function () {
+      clearTimeout(pending);
+      pending = setTimeout(function () {
+        var xhr = new XMLHttpRequest();
+        xhr.open('GET', input.getAttribute('data-autocomplete') + '?q=' + encodeURIComponent(input.value));
+        xhr.onload = function () {
+          if (xhr.status !== 200) return;
+          list.innerHTML = '';
+          JSON.parse(xhr.responseText).data.forEach(function (item) {
+            var option = document.createElement('option');
+            option.value = useIds ? item.id : item.name;
+            option.label = item.name;
+            list.appendChild(option);
+          });
+        };
+        xhr.send();
+      }, 100);
+    });
+  });
+});
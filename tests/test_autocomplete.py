@@ -0,0 +1,48 @@
+from autocomplete import PrefixIndex
+
+
+def _names(index, prefix, limit=10):
+    return [item['name'] for item in index.search(prefix, limit)]
+
+
+def test_search_matches_the_start_of_any_word():
+    index = PrefixIndex()
+    index.build([(1, 'The Musical Hop'), (2, 'Park Square Live Music & Coffee'), (3, 'The Dueling Pianos Bar')])
+    assert _names(index, 'mus') == ['Park Square Live Music & Coffee', 'The Musical Hop']
+    assert _names(index, 'the') == ['The Dueling Pianos Bar', 'The Musical Hop']
+    assert _names(index, '  MUSICAL   hop ') == ['The Musical Hop']
+    assert _names(index, 'music &') == ['Park Square Live Music & Coffee']
+    assert _names(index, 'usical') == []
+    assert _names(index, '   ') == []
+
+
+def test_search_lists_a_name_once_and_stops_at_the_limit():
+    index = PrefixIndex()
+    index.build([(1, 'Hop Hop Hop'), (2, 'Hop Two'), (3, 'Hop Three')])
+    assert _names(index, 'hop') == ['Hop Hop Hop', 'Hop Three', 'Hop Two']
+    assert len(index.search('hop', limit=2)) == 2
+
+
+def test_add_rename_and_remove():
+    index = PrefixIndex()
+    index.build([(1, 'The Musical Hop')])
+    index.add(2, 'Musical Chairs')
+    assert _names(index, 'musical') == ['Musical Chairs', 'The Musical Hop']
+    index.add(1, 'The Jazz Hop')  # a rename drops the old keys
+    assert _names(index, 'musical') == ['Musical Chairs']
+    assert _names(index, 'jazz') == ['The Jazz Hop']
+    index.remove(2)
+    index.remove(42)  # unknown ids are ignored
+    assert _names(index, 'musical') == []
+    assert index._keys == sorted(index._keys)
+
+
+def test_own_writes_keep_the_index_current():
+    index = PrefixIndex()
+    index.build([(1, 'The Musical Hop')], version=7)
+    index.add(2, 'Musical Chairs', version=8)
+    index.remove(1, version=9)
+    assert index.version == 9
+    # version 10 was another worker's: the index stays behind it and is rebuilt on the next check
+    index.add(3, 'Jazz Club', version=11)
+    assert index.version == 9
@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from models import Artist, Show
+from queries import decode_cursor, encode_cursor
+
+SHOWS = (Show.start_time, Show.id)
+
+
+def _tampered(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def test_round_trip():
+    start = datetime(2026, 10, 18, 20, 30, 15)
+    assert decode_cursor(encode_cursor([start, 42]), SHOWS) == [start, 42]
+    assert decode_cursor(encode_cursor(['The Wild Sax Band', 3]), (Artist.name, Artist.id)) == ['The Wild Sax Band', 3]
+    assert decode_cursor(encode_cursor([None, 7]), SHOWS) == [None, 7]
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    base64.urlsafe_b64encode(b'not json').decode(),
+    _tampered({'start_time': '2026-10-18', 'id': 1}),
+    _tampered(['2026-10-18T20:30:00']),
+    _tampered(['2026-10-18T20:30:00', 1, 2]),
+    _tampered(['tomorrow', 1]),
+    _tampered(['2026-10-18T20:30:00', '1 OR 1=1']),
+    _tampered(['2026-10-18T20:30:00', 1.5]),
+    _tampered(['2026-10-18T20:30:00', True]),
+    _tampered([20261018, 1]),
+    'ab',
+])
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(BadRequest):
+        decode_cursor(cursor, SHOWS)
+
+
+def test_name_cursor_rejects_a_number_for_the_name():
+    with pytest.raises(BadRequest):
+        decode_cursor(_tampered([1, 3]), (Artist.name, Artist.id))
@@ -0,0 +1,63 @@
+import gzip
+from datetime import datetime
+
+import pytest
+
+import forms
+from exporter import encode_rows, gzipped
+from importer import TARGETS, RowValidator, read_rows
+
+
+class _Result(list):
+    # the part of a SQLAlchemy result encode_rows uses
+    def __init__(self, keys, rows):
+        super().__init__(rows)
+        self._keys = keys
+
+    def keys(self):
+        return self._keys
+
+
+SHOWS = _Result(['id', 'venue_id', 'artist_id', 'start_time'], [
+    (1, 1, 4, datetime(2019, 5, 21, 21, 30)),
+    (2, 3, 5, datetime(2035, 4, 1, 20, 0, 59, 123456)),  # stored times may carry microseconds
+])
+VENUES = _Result(['id', 'name', 'city', 'state', 'address', 'phone', 'genres', 'image_link', 'website',
+                  'facebook_link', 'seeking_talent', 'seeking_description'], [
+    (1, 'The Musical Hop', 'San Francisco', 'CA', '1015 Folsom St', '123-123-1234', ['Jazz', 'Folk'],
+     'https://images.example.com/1.jpg', 'https://themusicalhop.com', 'https://www.facebook.com/TheMusicalHop',
+     'YES', 'Looking for local artists'),
+])
+
+
+def _round_trip(tmp_path, target, result, format, compress=False):
+    path = tmp_path / ('export.%s%s' % (format, '.gz' if compress else ''))
+    chunks = encode_rows(result, format)
+    if compress:
+        path.write_bytes(b''.join(gzipped(chunks)))
+    else:
+        path.write_text(''.join(chunks), encoding='utf-8', newline='')
+    validate = RowValidator(getattr(forms, TARGETS[target]['form']), TARGETS[target]['validated'])
+    return [validate(row) for _, row in read_rows(str(path))]
+
+
+@pytest.mark.parametrize('format', ['csv', 'ndjson'])
+@pytest.mark.parametrize('compress', [False, True])
+def test_exported_shows_import_with_the_same_start_times(tmp_path, format, compress):
+    checked = _round_trip(tmp_path, 'shows', SHOWS, format, compress)
+    assert [errors for _, errors in checked] == [[], []]
+    assert [values['start_time'] for values, _ in checked] == [row[3].replace(microsecond=0) for row in SHOWS]
+
+
+@pytest.mark.parametrize('format', ['csv', 'ndjson'])
+def test_exported_venues_import_with_the_same_genres(tmp_path, format):
+    [(values, errors)] = _round_trip(tmp_path, 'venues', VENUES, format)
+    assert errors == []
+    assert values['genres'] == ('Jazz', 'Folk') and values['name'] == 'The Musical Hop'
+
+
+def test_chunks_are_whole_lines(monkeypatch):
+    monkeypatch.setattr('exporter.CHUNK_SIZE', 50)
+    chunks = list(encode_rows(_Result(SHOWS.keys(), list(SHOWS) * 10)))
+    assert len(chunks) > 1 and all(chunk.endswith('\n') for chunk in chunks)
+    assert gzip.decompress(b''.join(gzipped(chunks))).decode() == ''.join(chunks)
@@ -0,0 +1,82 @@
+import pytest
+from flask import Flask
+from werkzeug.datastructures import MultiDict
+
+import forms
+from importer import LIST_SEPARATOR, TARGETS, RowValidator
+
+URLS = [
+    'https://venue1.example.com', 'HTTPS://EXAMPLE.COM:8080/path?q=1', 'http://a-b.c-d.example.org/x/',
+    'http://localhost', 'http://127.0.0.1/x', 'http://[::1]/', 'https://bücher.de/', 'https://xn--bcher-kva.de',
+    'https://-bad.com', 'https://bad-.com', 'https://a_b.example.com', 'https://x..com', 'https://example.c',
+    'https://example.com\n', 'https://%s.com' % ('a' * 64), 'https://%s.com' % ('a' * 63),
+    'https://%s.com' % '.'.join(['a' * 60] * 5), 'example.com', 'not a url', '', '   ',
+]
+BASE = {
+    'venues': {'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom St',
+               'phone': '123-123-1234', 'genres': 'Jazz;Folk', 'image_link': 'https://images.example.com/1.jpg',
+               'website': 'https://themusicalhop.com', 'facebook_link': 'https://www.facebook.com/TheMusicalHop',
+               'seeking_talent': 'YES', 'seeking_description': 'Looking for local artists'},
+    'artists': {'name': 'Guns N Petals', 'city': 'San Francisco', 'state': 'CA', 'phone': '326-123-5000',
+                'genres': 'Rock n Roll', 'image_link': 'https://images.example.com/2.jpg',
+                'website': 'https://gunsnpetalsband.com', 'facebook_link': 'https://www.facebook.com/GunsNPetals',
+                'seeking_venue': 'NO', 'seeking_description': 'Looking for shows'},
+    'shows': {'venue_id': '1', 'artist_id': '4', 'start_time': '2019-05-21 21:30:00'},
+}
+VARIANTS = {
+    'name': ['', '   ', 'x'],
+    'state': ['NY', 'ny', 'XX', ''],
+    'genres': ['Jazz', 'Jazz;Nope', 'Nope', ''],
+    'seeking_talent': ['NO', 'no', ''],
+    'seeking_venue': ['YES', 'maybe', ''],
+    'image_link': URLS,
+    'website': URLS,
+    'facebook_link': URLS,
+    'start_time': ['2019-05-21 21:30:00', '2019-05-21T21:30:00', '2019-13-01 00:00:00', 'tomorrow', '', '   '],
+}
+
+
+def _cases():
+    for target, base in BASE.items():
+        for column in TARGETS[target]['validated']:
+            for value in VARIANTS.get(column, ()):
+                yield target, dict(base, **{column: value})
+
+
+def _form_errors(form_class, row):
+    formdata = MultiDict()
+    for column, value in row.items():
+        if column == 'genres':
+            for genre in value.split(LIST_SEPARATOR) if value else ():
+                formdata.add(column, genre)
+        else:
+            formdata.add(column, value)
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', WTF_CSRF_ENABLED=False)
+    with app.test_request_context(method='POST'):
+        form = form_class(formdata=formdata)
+        form.validate()
+        return {name: field.errors[0] for name, field in form._fields.items() if field.errors}
+
+
+@pytest.mark.parametrize('target, row', list(_cases()))
+def test_rows_are_checked_like_the_create_forms(target, row):
+    form_class = getattr(forms, TARGETS[target]['form'])
+    columns = TARGETS[target]['validated']
+    expected = _form_errors(form_class, row)
+    expected = sorted('%s: %s' % (column, expected[column]) for column in columns if column in expected)
+    values, errors = RowValidator(form_class, columns)(row)
+    assert sorted(errors) == expected
+    assert set(values) == set(columns) - {error.split(':')[0] for error in errors}
+
+
+def test_values_are_cleaned():
+    validate = RowValidator(forms.VenueForm, TARGETS['venues']['validated'])
+    values, errors = validate(dict(BASE['venues'], genres=' Jazz ; Folk ;'))
+    assert errors == [] and values['genres'] == ('Jazz', 'Folk')
+    values, errors = RowValidator(forms.ShowForm, TARGETS['shows']['validated'])(BASE['shows'])
+    assert values['start_time'].isoformat() == '2019-05-21T21:30:00' and values['venue_id'] == '1'
+    # NDJSON gives lists and numbers, and repeats hit the verdict cache
+    row = dict(BASE['venues'], genres=['Jazz', 'Folk'], phone=1231231234)
+    assert validate(row) == validate(row)
+    assert validate(row)[0]['phone'] == '1231231234'
@@ -0,0 +1,53 @@
+import time
+
+from flask import Flask, Response, stream_with_context
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from metrics import Metrics, instrument_app, instrument_pool
+
+
+def _scrape(metrics, name):
+    for line in metrics.render().splitlines():
+        if line.startswith(name + '{') or line.startswith(name + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+def test_pool_metrics_follow_the_engine_across_dispose():
+    # gunicorn's post_fork disposes every engine, so each worker starts with a new pool
+    engine = create_engine('sqlite://', poolclass=QueuePool, pool_size=2, max_overflow=0)
+    metrics = Metrics()
+    instrument_pool(engine, metrics)
+    engine.dispose(close=False)
+
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+        assert _scrape(metrics, 'fyyur_db_pool_checked_out') == 1
+    assert _scrape(metrics, 'fyyur_db_pool_checked_out') == 0
+    assert _scrape(metrics, 'fyyur_db_pool_checkouts_total') == 1
+    assert _scrape(metrics, 'fyyur_db_pool_connections_total') == 1
+    assert _scrape(metrics, 'fyyur_db_pool_checkout_wait_seconds_count') == 1
+
+
+def test_streamed_request_is_timed_until_the_response_closes():
+    app = Flask(__name__)
+    metrics = Metrics()
+    instrument_app(app, metrics)
+
+    @app.route('/stream')
+    def stream():
+        def generate():
+            for chunk in ('a', 'b'):
+                time.sleep(0.05)
+                yield chunk
+        return Response(stream_with_context(generate()))
+
+    response = app.test_client().get('/stream', buffered=False)
+    assert _scrape(metrics, 'fyyur_requests_in_flight') == 1
+    assert response.get_data() == b'ab'
+    response.close()
+    assert _scrape(metrics, 'fyyur_requests_in_flight') == 0
+    assert _scrape(metrics, 'fyyur_requests_total') == 1
+    assert _scrape(metrics, 'fyyur_request_duration_seconds_count') == 1
+    assert _scrape(metrics, 'fyyur_request_duration_seconds_sum') >= 0.1
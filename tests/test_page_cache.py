@@ -0,0 +1,57 @@
+import time
+
+from page_cache import PageCache
+
+
+def test_get_returns_what_was_set_until_the_ttl():
+    cache = PageCache(ttl=60)
+    cache.set('/venues', 'page')
+    assert cache.get('/venues') == 'page'
+    assert cache.get('/artists') is None
+    cache.set('/shows', 'page', expires_at=time.time() - 1)  # an upcoming show already started
+    assert cache.get('/shows') is None
+    cache.ttl = -1
+    cache.set('/venues', 'page')
+    assert cache.get('/venues') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = PageCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_budget():
+    cache = PageCache(max_bytes=100, max_total_bytes=250)
+    cache.set('big', b'x' * 101, size=101)
+    assert cache.get('big') is None
+    cache.set('a', b'a' * 100, size=100)
+    cache.set('b', b'b' * 100, size=100)
+    cache.set('c', b'c' * 100, size=100)
+    assert cache.get('a') is None
+    assert cache.stats()['bytes'] == 200
+    cache.set('b', b'b', size=1)  # replacing an entry frees its old size
+    assert cache.stats()['bytes'] == 101
+    cache.set('c', b'c' * 101, size=101)  # too large now: the stale copy goes too
+    assert cache.get('c') is None
+    assert cache.stats()['bytes'] == 1
+
+
+def test_invalidate_drops_the_entries_of_any_tag():
+    cache = PageCache()
+    cache.set('/venues', 1, tags=['venues'])
+    cache.set('/venues/1', 2, tags=['venue:1', 'shows'])
+    cache.set('/artists', 3, tags=['artists'])
+    cache.invalidate('venue:1', 'venues')
+    assert cache.get('/venues') is None and cache.get('/venues/1') is None
+    assert cache.get('/artists') == 3
+    assert cache.invalidated_at > 0  # streamed pages being sent now are not stored
+    assert cache.stats()['invalidations'] == 2
+    cache.invalidate('shows')  # the tag left with its last entry
+    assert cache.stats()['invalidations'] == 2
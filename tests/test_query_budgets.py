@@ -0,0 +1,87 @@
+"""
+Every endpoint in SQL_QUERY_BUDGETS, requested once under TESTING with SQL_BUDGET_STRICT
+on, so a view going over its budget fails here instead of logging a warning in production.
+
+The views need Postgres (pg_trgm, ARRAY columns): point TEST_DATABASE_URL at a throwaway
+database, which the tests migrate, truncate and seed. Without it only the check that
+every budget has a request here runs.
+"""
+import os
+
+import pytest
+
+import config
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+# endpoint -> (method, url, form); ids 1 exist in the seeded data
+REQUESTS = {
+    'pages.index': ('GET', '/', None),
+    'pages.autocomplete': ('GET', '/autocomplete/venues?q=the', None),
+    'pages.healthz': ('GET', '/healthz', None),
+    'pages.readyz': ('GET', '/readyz', None),
+    'venues.venues': ('GET', '/venues', None),
+    'venues.show_venue': ('GET', '/venues/1', None),
+    'venues.search_venues': ('POST', '/venues/search', {'search_term': 'Hop'}),
+    'artists.artists': ('GET', '/artists', None),
+    'artists.show_artist': ('GET', '/artists/1', None),
+    'artists.search_artists': ('POST', '/artists/search', {'search_term': 'band'}),
+    'shows.shows': ('GET', '/shows', None),
+    'exports.export': ('GET', '/exports/shows', None),
+    'api.venues': ('GET', '/api/v1/venues', None),
+    'api.show_venue': ('GET', '/api/v1/venues/1', None),
+    'api.search_venues': ('GET', '/api/v1/venues/search?q=Hop', None),
+    'api.artists': ('GET', '/api/v1/artists?fields=id,name,num_upcoming_shows', None),
+    'api.show_artist': ('GET', '/api/v1/artists/1', None),
+    'api.search_artists': ('GET', '/api/v1/artists/search?q=band', None),
+    'api.shows': ('GET', '/api/v1/shows?fields=start_time,artist_image_link,venue_image_link', None),
+}
+
+
+def _config(**overrides):
+    values = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    values.update(overrides)
+    return type('TestConfig', (object,), values)
+
+
+@pytest.fixture(scope='module')
+def app():
+    if not TEST_DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    from flask_migrate import upgrade
+
+    from app import create_app
+    from benchmark import generate
+    from models import db, Venue, Artist, Show
+
+    test_config = _config(TESTING=True, SQL_BUDGET_STRICT=True, SQLALCHEMY_DATABASE_URI=TEST_DATABASE_URL,
+                          DATABASE_REPLICA_URL=None, SQLALCHEMY_BINDS={}, SECRET_KEY='test',
+                          SESSION_BACKEND='cookie', WTF_CSRF_ENABLED=False, PROFILER_ENABLED=False)
+    with create_app(test_config, migrations=True).app_context():
+        upgrade(directory=MIGRATIONS)
+    app = create_app(test_config)
+    tables = {'Venue': Venue.__table__, 'Artist': Artist.__table__, 'Show': Show.__table__}
+    with app.app_context():
+        db.session.execute(db.text('TRUNCATE "Show", "Venue", "Artist" RESTART IDENTITY'))
+        for table, rows in generate(200):
+            db.session.execute(tables[table].insert(), rows)
+        db.session.commit()
+    return app
+
+
+def test_every_budget_is_requested():
+    assert set(REQUESTS) == set(config.SQL_QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize('endpoint', sorted(REQUESTS))
+def test_query_budget(app, endpoint):
+    method, url, form = REQUESTS[endpoint]
+    client = app.test_client()
+    # the strict budget raises QueryBudgetExceeded inside the request; assert_max_queries also
+    # counts what a streamed response runs after the view has returned
+    with app.extensions['sql_instrumentation'].assert_max_queries(config.SQL_QUERY_BUDGETS[endpoint]):
+        response = client.open(url, method=method, data=form)
+        response.get_data()
+        response.close()
+    assert response.status_code == 200
@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest
+from flask import Flask, session
+
+from session_store import FilesystemSessionStore, SQLiteSessionStore, init_sessions
+
+
+@pytest.fixture(params=['filesystem', 'sqlite'])
+def app(request, tmp_path):
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', SESSION_BACKEND=request.param, SESSION_DIR=str(tmp_path / 'sessions'),
+                      SESSION_SQLITE_PATH=str(tmp_path / 'sessions.sqlite3'))
+    init_sessions(app)
+
+    @app.route('/set/<value>')
+    def set_value(value):
+        session['value'] = value
+        return ''
+
+    @app.route('/get')
+    def get_value():
+        return session.get('value', '')
+
+    @app.route('/clear')
+    def clear():
+        session.clear()
+        return ''
+
+    return app
+
+
+def _cookie(client, app):
+    cookie = client.get_cookie(app.config['SESSION_COOKIE_NAME'])
+    return cookie.value if cookie else None
+
+
+def test_data_stays_in_the_store_and_the_cookie_holds_a_signed_id(app):
+    client = app.test_client()
+    client.get('/set/secret')
+    cookie = _cookie(client, app)
+    sid, signature = cookie.rsplit('.', 1)
+    assert 'secret' not in cookie and signature
+    assert app.session_interface.store.load(sid) == {'value': 'secret'}
+    assert client.get('/get').get_data(as_text=True) == 'secret'
+
+
+def test_a_tampered_or_unsigned_id_gets_a_new_session(app):
+    client = app.test_client()
+    client.get('/set/secret')
+    sid = _cookie(client, app).rsplit('.', 1)[0]
+    name = app.config['SESSION_COOKIE_NAME']
+    for forged in (sid, sid + '.forged', 'x' + _cookie(client, app)):
+        other = app.test_client()
+        other.set_cookie(name, forged)
+        assert other.get('/get').get_data(as_text=True) == ''
+
+
+def test_empty_sessions_are_not_stored_and_cleared_ones_are_deleted(app):
+    client = app.test_client()
+    client.get('/get')
+    assert _cookie(client, app) is None
+    client.get('/set/secret')
+    sid = _cookie(client, app).rsplit('.', 1)[0]
+    client.get('/clear')
+    assert app.session_interface.store.load(sid) is None
+    assert _cookie(client, app) is None
+
+
+def _files(store):
+    return len(os.listdir(store.directory))
+
+
+def _rows(store):
+    return store._connection().execute('SELECT count(*) FROM sessions').fetchone()[0]
+
+
+@pytest.mark.parametrize('make_store, stored', [
+    (lambda tmp_path: FilesystemSessionStore(str(tmp_path / 'sessions')), _files),
+    (lambda tmp_path: SQLiteSessionStore(str(tmp_path / 'sessions.sqlite3')), _rows),
+])
+def test_expired_sessions_are_not_loaded_and_purged(make_store, stored, tmp_path):
+    store = make_store(tmp_path)
+    store.save('live', {'value': 1}, time.time() + 60)
+    store.save('expired', {'value': 2}, time.time() - 1)
+    assert store.load('live') == {'value': 1}
+    assert store.load('expired') is None
+    store.purge_expired()
+    assert stored(store) == 1
+    store.delete('live')
+    assert store.load('live') is None and stored(store) == 0
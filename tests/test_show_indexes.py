@@ -0,0 +1,136 @@
+"""
+The venue and artist show partitions and the /shows keyset page are planned on the
+ix_Show_* indexes of migration 8e2b4c6d1a37, and are not without them.
+
+Needs Postgres: point TEST_DATABASE_URL at a throwaway database, which the test migrates,
+truncates and seeds. Sequential scans are disabled while planning, so the plans do not
+depend on how many rows the seed makes; only the choice between indexes is tested.
+"""
+import os
+
+import pytest
+
+import config
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+BEFORE_INDEXES = '5d1f0c7a9b21'
+INDEXES = '8e2b4c6d1a37'
+
+# query -> index it must use after the upgrade
+EXPECTED = {
+    'venue shows': 'ix_Show_venue_id_start_time',
+    'venue show counts': 'ix_Show_venue_id_start_time',
+    'artist shows': 'ix_Show_artist_id_start_time',
+    'artist show counts': 'ix_Show_artist_id_start_time',
+    '/shows page': 'ix_Show_start_time',
+    '/shows next page': 'ix_Show_start_time',
+}
+
+
+def _config(**overrides):
+    values = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    values.update(overrides)
+    return type('TestConfig', (object,), values)
+
+
+@pytest.fixture(scope='module')
+def apps():
+    if not TEST_DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    from flask_migrate import upgrade
+
+    from app import create_app
+    from benchmark import generate
+    from models import db, Venue, Artist, Show
+
+    test_config = _config(TESTING=True, SQLALCHEMY_DATABASE_URI=TEST_DATABASE_URL, DATABASE_REPLICA_URL=None,
+                          SQLALCHEMY_BINDS={}, SECRET_KEY='test', SESSION_BACKEND='cookie', PROFILER_ENABLED=False)
+    migrations_app = create_app(test_config, migrations=True)
+    with migrations_app.app_context():
+        upgrade(directory=MIGRATIONS)
+    app = create_app(test_config)
+    tables = {'Venue': Venue.__table__, 'Artist': Artist.__table__, 'Show': Show.__table__}
+    with app.app_context():
+        db.session.execute(db.text('TRUNCATE "Show", "Venue", "Artist" RESTART IDENTITY'))
+        for table, rows in generate(200):
+            db.session.execute(tables[table].insert(), rows)
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE "Venue", "Artist", "Show"'))
+        db.session.commit()
+    return migrations_app, app
+
+
+def _statements(app):
+    # the statements the views run, as sent to the driver
+    from sqlalchemy import event
+
+    from models import db, Artist, Show
+    from queries import encode_cursor, keyset_page, show_partitions
+
+    statements = {}
+    with app.test_request_context():
+        def run(label, call):
+            captured = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                captured.append((statement, parameters))
+
+            event.listen(db.engine, 'before_cursor_execute', capture)
+            try:
+                call()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', capture)
+            statements[label] = captured[-1]
+
+        first_show = db.session.query(Show.start_time, Show.id).order_by(Show.start_time, Show.id).first()
+        shows = db.session.query(Show.id, Show.venue_id, Show.venue_name, Show.artist_id, Show.artist_name,
+                                 Artist.image_link.label('artist_image_link'), Show.start_time) \
+            .outerjoin(Artist, Artist.id == Show.artist_id)
+        run('venue shows', lambda: show_partitions(Show.venue_id, [1], with_shows=True))
+        run('venue show counts', lambda: show_partitions(Show.venue_id, [1, 2, 3]))
+        run('artist shows', lambda: show_partitions(Show.artist_id, [1], with_shows=True))
+        run('artist show counts', lambda: show_partitions(Show.artist_id, [1, 2, 3]))
+        run('/shows page', lambda: keyset_page(shows, (Show.start_time, Show.id)))
+        run('/shows next page', lambda: keyset_page(shows, (Show.start_time, Show.id),
+                                                     after=encode_cursor(list(first_show))))
+        db.session.remove()
+    return statements
+
+
+def _plans(app):
+    from models import db
+
+    statements = _statements(app)
+    plans = {}
+    with app.app_context(), db.engine.connect() as connection:
+        connection.exec_driver_sql('SET enable_seqscan = off')
+        for label, (statement, parameters) in statements.items():
+            rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).all()
+            plans[label] = '\n'.join(row[0] for row in rows)
+        connection.rollback()
+    return plans
+
+
+def test_show_queries_use_the_show_indexes_only_after_upgrade(apps):
+    from flask_migrate import stamp, upgrade
+
+    from models import db
+
+    migrations_app, app = apps
+    with app.app_context():
+        for index in set(EXPECTED.values()):
+            db.session.execute(db.text('DROP INDEX IF EXISTS "%s"' % index))
+        db.session.commit()
+    before = _plans(app)
+
+    # run just the index migration again; the later ones stay applied
+    with migrations_app.app_context():
+        stamp(directory=MIGRATIONS, revision=BEFORE_INDEXES)
+        upgrade(directory=MIGRATIONS, revision=INDEXES)
+        stamp(directory=MIGRATIONS, revision='heads')
+    after = _plans(app)
+
+    for label, index in EXPECTED.items():
+        assert 'ix_Show_' not in before[label], before[label]
+        assert index in after[label], after[label]
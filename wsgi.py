@@ -0,0 +1,9 @@
+import os
+
+# WSGI servers get the production profile (debug off) unless FYYUR_ENV says otherwise
+os.environ.setdefault('FYYUR_ENV', 'production')
+
+from app import create_app
+
+# entry point for WSGI servers, e.g. `gunicorn wsgi:app` (settings in gunicorn.conf.py)
+app = create_app()